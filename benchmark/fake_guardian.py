@@ -0,0 +1,299 @@
+"""
+A local stand-in for the Guardian content API, for benchmarks and
+offline experiments with concurrency, caching and backoff.
+
+It serves /search (with pagination) and single-content endpoints,
+with configurable latency distributions, payload sizes, injected
+429/5xx responses and per-key rate limits. Run it on its own with
+
+    python benchmark/fake_guardian.py --port 8080 --latency 0.1
+
+and point the transformation lambda at it with
+GUARDIAN_API_URL=http://127.0.0.1:8080.
+"""
+import argparse
+import collections
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "exponential", "lognormal"]
+
+
+class FakeGuardian:
+    """
+    A local stand-in for the Guardian content API, serving on localhost.
+    Every search returns the same generated articles.
+
+    Parameters
+    ----------
+    latency : float (optional)
+        The mean number of seconds each request waits before it is answered.
+    latency_distribution : str (optional)
+        "fixed", "uniform" (0 to twice the mean), "exponential"
+        or "lognormal" (a long tail, like real network latency).
+    body_size : int (optional)
+        The mean number of characters of each article body.
+    body_size_spread : float (optional)
+        The spread of the body sizes. 0 makes every body body_size long,
+        larger values give lognormally distributed sizes.
+    total_results : int (optional)
+        The number of results of every search, split into pages.
+    error_rate : float (optional)
+        The share of requests answered with a 503.
+    throttle_rate : float (optional)
+        The share of requests answered with a 429 and a Retry-After.
+    rate_limit : float (optional)
+        The requests per second allowed for each API key, above which
+        requests are answered with a 429. 0 means no limit.
+    retry_after : int (optional)
+        The Retry-After, in seconds, of every 429.
+    api_keys : list (optional)
+        The accepted API keys. Other keys get a 401. Accepts any key
+        when not set.
+    port : int (optional)
+        The port to listen on. Defaults to a free port.
+    seed : int (optional)
+        Seeds the articles, latencies and injected errors,
+        so runs are reproducible.
+    """
+
+    def __init__(self, latency=0.0, latency_distribution="fixed",
+                 body_size=5000, body_size_spread=0.0, total_results=10,
+                 error_rate=0.0, throttle_rate=0.0, rate_limit=0.0,
+                 retry_after=1, api_keys=None, port=0, seed=0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {latency_distribution}.")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.body_size = body_size
+        self.body_size_spread = body_size_spread
+        self.total_results = total_results
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.api_keys = None if api_keys is None else set(api_keys)
+        self.port = port
+        self.seed = seed
+        self.requests = 0
+        self.statuses = collections.Counter()
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port),
+                                           self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def article(self, content_id, show_body=True):
+        """Builds the result of a single article."""
+        rng = random.Random(f"{self.seed}-{content_id}")
+        size = self.body_size
+        if self.body_size_spread:
+            size = int(rng.lognormvariate(
+                math.log(max(1, self.body_size)), self.body_size_spread))
+        result = {
+            "id": content_id,
+            "type": "article",
+            "webPublicationDate": "2023-11-21T11:11:31Z",
+            "webTitle": f"Article {content_id}",
+            "webUrl": f"https://www.theguardian.com/{content_id}",
+            "apiUrl": f"{self.url}/{content_id}",
+            "fields": {"lastModified": "2023-11-21T11:11:31Z"},
+        }
+        if show_body:
+            result["fields"]["body"] = rng.choice("abcdefghij") * size
+        return result
+
+    def search(self, query):
+        """Builds the response of a search, for the requested page."""
+        terms = query.get("q", [""])[0].replace(" ", "-")
+        show_body = "body" in query.get("show-fields", [""])[0]
+        page_size = min(200, int(query.get("page-size", ["10"])[0]))
+        page = int(query.get("page", ["1"])[0])
+        pages = max(1, math.ceil(self.total_results / page_size))
+        if page > pages:
+            return 400, {"response": {
+                "status": "error",
+                "message": "requested page is beyond the number of "
+                           "available pages"}}
+
+        first = (page - 1) * page_size
+        last = min(self.total_results, first + page_size)
+        results = [self.article(f"{terms}/{i}", show_body)
+                   for i in range(first, last)]
+        return 200, {"response": {"status": "ok",
+                                  "total": self.total_results,
+                                  "startIndex": first + 1,
+                                  "pageSize": page_size,
+                                  "currentPage": page,
+                                  "pages": pages,
+                                  "results": results}}
+
+    def choose_response(self, api_key):
+        """
+        Decides whether a request fails, and how long it waits.
+
+        Returns
+        -------
+        tuple
+            The latency in seconds, and the error status or None.
+        """
+        with self._lock:
+            self.requests += 1
+            latency = self._draw_latency()
+            if self.api_keys is not None and api_key not in self.api_keys:
+                return latency, 401
+            if self.rate_limit and not self._take_token(api_key):
+                return latency, 429
+            draw = self._random.random()
+            if draw < self.throttle_rate:
+                return latency, 429
+            if draw < self.throttle_rate + self.error_rate:
+                return latency, 503
+            return latency, None
+
+    def _draw_latency(self):
+        """Draws the latency of a request from the distribution."""
+        if not self.latency or self.latency_distribution == "fixed":
+            return self.latency
+        if self.latency_distribution == "uniform":
+            return self._random.uniform(0, 2 * self.latency)
+        if self.latency_distribution == "exponential":
+            return self._random.expovariate(1 / self.latency)
+        # A sigma of 0.5 gives a p99 of about three times the median.
+        sigma = 0.5
+        return self._random.lognormvariate(
+            math.log(self.latency) - sigma ** 2 / 2, sigma)
+
+    def _take_token(self, api_key):
+        """Takes a token from the API key's bucket, if one is left."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(api_key, (1.0, now))
+        tokens = min(1.0, tokens + (now - updated_at) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[api_key] = (tokens, now)
+            return False
+        self._buckets[api_key] = (tokens - 1, now)
+        return True
+
+    def _make_handler(self):
+        guardian = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                # The key is sent in a header, like the Guardian API
+                # also accepts, or in the query.
+                latency, error = guardian.choose_response(
+                    self.headers.get("api-key")
+                    or query.get("api-key", [None])[0])
+                time.sleep(latency)
+
+                if error == 401:
+                    self._send(401, {"message": "Unauthorized"})
+                elif error == 429:
+                    self._send(429, {"message": "API rate limit exceeded"},
+                               {"Retry-After": str(guardian.retry_after)})
+                elif error == 503:
+                    self._send(503, {"message": "Service Unavailable"})
+                elif url.path == "/search":
+                    self._send(*guardian.search(query))
+                else:
+                    content = guardian.article(url.path.lstrip("/"))
+                    self._send(200, {"response": {"status": "ok",
+                                                  "content": content}})
+
+            def _send(self, status, payload, headers=None):
+                with guardian._lock:
+                    guardian.statuses[status] += 1
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    """Runs the fake Guardian API until interrupted."""
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the Guardian API.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-distribution",
+                        choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--body-size", type=int, default=5000)
+    parser.add_argument("--body-size-spread", type=float, default=0.0)
+    parser.add_argument("--total-results", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Requests per second allowed per API key.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    guardian = FakeGuardian(
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        body_size=args.body_size,
+        body_size_spread=args.body_size_spread,
+        total_results=args.total_results,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        port=args.port,
+        seed=args.seed)
+    with guardian:
+        print(f"Fake Guardian API listening on {guardian.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    print(f"Served {guardian.requests} requests: {dict(guardian.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Benchmarks the whole pipeline in-process:
+input tool -> ingestion_handler -> transformation_handler -> loading_handler,
+against moto (S3, Kinesis and Secrets Manager) and a local fake Guardian API.
+
+Reports the p50/p95/p99 latency of each stage and the searches per second
+of the whole pipeline, for each batch size. p95 and p99 need at least
+20 runs per batch size (--repeat). Results can be saved with
+--output, and compared against a saved baseline with --baseline,
+failing when the throughput drops by more than --tolerance.
+
+    python benchmark/pipeline_benchmark.py --batch-sizes 1 10 50 --repeat 20
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from fake_guardian import FakeGuardian, LATENCY_DISTRIBUTIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["input", "ingestion", "transformation", "loading"]
+INGESTED_BUCKET = "streaming-data-ingested-data-bucket"
+TRANSFORMED_BUCKET = "streaming-data-transformed-data-bucket"
+# Fewer samples only give the median: their p95 and p99 are noise.
+MIN_TAIL_SAMPLES = 20
+INPUT_STREAM = "streaming_data_project_input"
+OUTPUT_STREAM = "streaming_data_project_output"
+
+
+def setup_environment(guardian_url, max_results=None):
+    """Points the lambdas at moto and the fake Guardian API."""
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "eu-west-2",
+        "GUARDIAN_API_URL": guardian_url,
+        # The EMF documents of every invocation would bury the results.
+        "METRICS_ENABLED": "false",
+    })
+    if max_results:
+        os.environ["GUARDIAN_MAX_RESULTS"] = str(max_results)
+    for path in ["src/ingestion_lambda",
+                 "src/transformation_lambda",
+                 "src/loading_lambda",
+                 "src"]:
+        sys.path.insert(0, os.path.join(ROOT, path))
+
+
+def create_resources():
+    """Creates the buckets, streams and secret used by the pipeline."""
+    import boto3
+
+    s3 = boto3.client("s3")
+    for bucket in [INGESTED_BUCKET, TRANSFORMED_BUCKET]:
+        s3.create_bucket(
+            Bucket=bucket,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+    kinesis = boto3.client("kinesis")
+    for stream in [INPUT_STREAM, OUTPUT_STREAM]:
+        kinesis.create_stream(StreamName=stream, ShardCount=1)
+    boto3.client("secretsmanager").create_secret(
+        Name="guardian_api_key",
+        SecretString=json.dumps({"api_key": "benchmark"}))
+    return s3, kinesis
+
+
+def s3_event(s3, bucket):
+    """Builds the S3 event of every object in the bucket."""
+    keys = [c["Key"] for c in s3.list_objects_v2(
+        Bucket=bucket).get("Contents", [])]
+    return {"Records": [{"s3": {"bucket": {"name": bucket},
+                                "object": {"key": key}}}
+                        for key in keys]}
+
+
+def empty_bucket(s3, bucket):
+    """Deletes every object of the bucket, between iterations."""
+    for record in s3_event(s3, bucket)["Records"]:
+        s3.delete_object(Bucket=bucket, Key=record["s3"]["object"]["key"])
+
+
+def kinesis_event(kinesis, shard_iterator):
+    """Reads the new records of the input stream as a Kinesis event."""
+    records = kinesis.get_records(ShardIterator=shard_iterator)["Records"]
+    return {"Records": [{
+        "kinesis": {
+            "partitionKey": record["PartitionKey"],
+            "data": base64.b64encode(record["Data"]).decode("utf-8"),
+            "sequenceNumber": record["SequenceNumber"],
+        },
+        "eventSource": "aws:kinesis",
+        "eventID": f"shardId-000000000000:{record['SequenceNumber']}",
+    } for record in records]}
+
+
+def run_pipeline(s3, kinesis, searches):
+    """
+    Sends the searches through every stage once.
+
+    Returns
+    -------
+    dict
+        The seconds taken by each stage.
+    """
+    from input_tool.put_record_util import KinesisProducer
+    from ingestion_handler import ingestion_handler
+    from transformation_handler import transformation_handler
+    from loading_handler import loading_handler
+    from search_cache import clear_search_cache
+    from preview_cache import clear_preview_cache
+
+    clear_search_cache()
+    clear_preview_cache()
+    empty_bucket(s3, INGESTED_BUCKET)
+    empty_bucket(s3, TRANSFORMED_BUCKET)
+    shard_iterator = kinesis.get_shard_iterator(
+        StreamName=INPUT_STREAM, ShardId="shardId-000000000000",
+        ShardIteratorType="LATEST")["ShardIterator"]
+
+    timings = {}
+    start = time.perf_counter()
+    with KinesisProducer(client=kinesis) as producer:
+        for search in searches:
+            producer.put(json.dumps(search).encode("utf-8"))
+    timings["input"] = time.perf_counter() - start
+
+    event = kinesis_event(kinesis, shard_iterator)
+    start = time.perf_counter()
+    ingestion_handler(event, None)
+    timings["ingestion"] = time.perf_counter() - start
+
+    event = s3_event(s3, INGESTED_BUCKET)
+    start = time.perf_counter()
+    transformation_handler(event, None)
+    timings["transformation"] = time.perf_counter() - start
+
+    event = s3_event(s3, TRANSFORMED_BUCKET)
+    start = time.perf_counter()
+    loading_handler(event, None)
+    timings["loading"] = time.perf_counter() - start
+
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def percentiles(samples):
+    """
+    The p50, p95 and p99 of the samples.
+    p95 and p99 are None with fewer than MIN_TAIL_SAMPLES samples.
+    """
+    if len(samples) < MIN_TAIL_SAMPLES:
+        return {"p50": statistics.median(samples), "p95": None, "p99": None}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def format_milliseconds(seconds):
+    """Formats a percentile for the table, or "-" when it is unknown."""
+    return f"{'-':>9}" if seconds is None else f"{seconds * 1000:9.1f}"
+
+
+def run_benchmark(batch_sizes, repeat, warmup, max_results=None,
+                  **guardian_options):
+    """
+    Runs the pipeline repeat times for each batch size,
+    after warmup iterations that are not measured.
+    guardian_options are passed to FakeGuardian, e.g. latency.
+
+    Returns
+    -------
+    dict
+        For each batch size, the percentiles of each stage in seconds,
+        and the median searches per second.
+    """
+    from moto import mock_aws
+
+    results = {}
+    with FakeGuardian(**guardian_options) as guardian, mock_aws():
+        setup_environment(guardian.url, max_results)
+        from aws_clients import reset_clients
+        from input_tool.aws_clients import reset_clients as reset_input
+        reset_clients()
+        reset_input()
+        s3, kinesis = create_resources()
+
+        for batch_size in batch_sizes:
+            searches = [{"search_term": f"search {i}",
+                         "date_from": "2023-01-01",
+                         "reference": "guardian_content"}
+                        for i in range(batch_size)]
+            for _ in range(warmup):
+                run_pipeline(s3, kinesis, searches)
+            samples = [run_pipeline(s3, kinesis, searches)
+                       for _ in range(repeat)]
+
+            results[str(batch_size)] = {
+                "stages": {stage: percentiles([s[stage] for s in samples])
+                           for stage in STAGES + ["total"]},
+                "searches_per_second": statistics.median(
+                    batch_size / s["total"] for s in samples),
+            }
+        results["guardian"] = {"requests": guardian.requests,
+                               "statuses": dict(guardian.statuses)}
+    return results
+
+
+def format_results(results):
+    """Formats the results as a table."""
+    lines = [f"{'batch':>6} {'stage':<15} {'p50 ms':>9} {'p95 ms':>9} "
+             f"{'p99 ms':>9}"]
+    for batch_size, result in results.items():
+        if batch_size == "guardian":
+            continue
+        for stage, cuts in result["stages"].items():
+            lines.append(f"{batch_size:>6} {stage:<15} "
+                         f"{format_milliseconds(cuts['p50'])} "
+                         f"{format_milliseconds(cuts['p95'])} "
+                         f"{format_milliseconds(cuts['p99'])}")
+        lines.append(f"{batch_size:>6} {'searches/s':<15} "
+                     f"{result['searches_per_second']:9.1f}")
+    guardian = results["guardian"]
+    lines.append(f"Guardian requests: {guardian['requests']} "
+                 f"{guardian['statuses']}")
+    return "\n".join(lines)
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Lists the batch sizes whose throughput dropped by more than tolerance.
+
+    Returns
+    -------
+    list
+        A message for each regression.
+    """
+    regressions = []
+    for batch_size, result in results.items():
+        if batch_size == "guardian" or batch_size not in baseline:
+            continue
+        expected = baseline[batch_size]["searches_per_second"]
+        actual = result["searches_per_second"]
+        if actual < expected * (1 - tolerance):
+            regressions.append(
+                f"Batch size {batch_size}: {actual:.1f} searches/s, "
+                f"baseline {expected:.1f} searches/s.")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline end to end, in-process.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=MIN_TAIL_SAMPLES,
+                        help="Measured runs per batch size. p95 and p99 "
+                             f"need at least {MIN_TAIL_SAMPLES}.")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Mean seconds each Guardian request takes.")
+    parser.add_argument("--latency-distribution",
+                        choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--body-size", type=int, default=5000,
+                        help="Mean characters of each article body.")
+    parser.add_argument("--body-size-spread", type=float, default=0.0)
+    parser.add_argument("--total-results", type=int, default=10,
+                        help="Articles found by each search.")
+    parser.add_argument("--max-results", type=int,
+                        help="Sets GUARDIAN_MAX_RESULTS, to walk pages.")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of Guardian requests failing with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Share of Guardian requests failing with 429.")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Guardian requests per second per API key.")
+    parser.add_argument("--output", help="Saves the results as JSON.")
+    parser.add_argument("--baseline",
+                        help="JSON results of an earlier run to compare to.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed drop in searches per second.")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Keeps the logs of the lambdas.")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    results = run_benchmark(
+        args.batch_sizes, args.repeat, args.warmup, args.max_results,
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        body_size=args.body_size,
+        body_size_spread=args.body_size_spread,
+        total_results=args.total_results,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = compare_to_baseline(
+                results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# "json" writes a single compact JSON document,
+# "ndjson" writes one article per line,
+# "ndjson-gzip" and "ndjson-zstd" compress the NDJSON output.
+OUTPUT_FORMAT = os.environ.get("TRANSFORMED_OUTPUT_FORMAT", "json")
+
+# File name suffix and Content-Encoding of each format.
+FORMATS = {
+    "json": (".json", None),
+    "ndjson": (".ndjson", None),
+    "ndjson-gzip": (".ndjson.gz", "gzip"),
+    "ndjson-zstd": (".ndjson.zst", "zstd"),
+}
+
+
+def get_suffix(output_format=None):
+    """
+    The file name suffix of an output format.
+
+    Raises
+    ------
+    ValueError
+        If there is no format with that name.
+    """
+    output_format = output_format or OUTPUT_FORMAT
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}.")
+    return FORMATS[output_format][0]
+
+
+def encode_content(content, output_format=None):
+    """
+    Serialises the transformed content in the output format.
+
+    Parameters
+    ----------
+    content : dict
+        The transformed {"content": {...}} document.
+    output_format : str (optional)
+        One of "json", "ndjson", "ndjson-gzip" or "ndjson-zstd".
+        Defaults to the TRANSFORMED_OUTPUT_FORMAT environment variable,
+        or "json".
+
+    Raises
+    ------
+    ValueError
+        If there is no format with that name, or zstd is not installed.
+
+    Returns
+    -------
+    tuple
+        The encoded content in bytes, and its Content-Encoding,
+        or None when it is not compressed.
+    """
+    output_format = output_format or OUTPUT_FORMAT
+    get_suffix(output_format)
+    content_encoding = FORMATS[output_format][1]
+
+    if output_format == "json":
+        data = json.dumps(content, separators=(",", ":"), ensure_ascii=False)
+    else:
+        data = "".join(
+            json.dumps({key: article}, separators=(",", ":"),
+                       ensure_ascii=False) + "\n"
+            for key, article in content.get("content", {}).items())
+    return compress(data.encode("utf-8"), content_encoding), content_encoding
+
+
+def decode_content(data, key, content_encoding=None):
+    """
+    Reads transformed content written by encode_content.
+    The format is detected from the key suffix or the Content-Encoding.
+
+    Parameters
+    ----------
+    data : bytes
+        The contents of the S3 object.
+    key : str
+        The key of the S3 object.
+    content_encoding : str (optional)
+        The ContentEncoding of the S3 object.
+
+    Raises
+    ------
+    OSError
+        If the gzip data is not valid.
+    ValueError
+        If the data is not valid JSON, or zstd is not installed.
+
+    Returns
+    -------
+    bytes
+        The transformed content as a single JSON document.
+    """
+    if content_encoding not in ("gzip", "zstd"):
+        if key.endswith(".gz"):
+            content_encoding = "gzip"
+        elif key.endswith(".zst"):
+            content_encoding = "zstd"
+    data = decompress(data, content_encoding)
+
+    if not key.removesuffix(".gz").removesuffix(".zst").endswith(".ndjson"):
+        return data
+
+    content = {}
+    for line in data.splitlines():
+        if line.strip():
+            content.update(json.loads(line))
+    return json.dumps({"content": content},
+                      ensure_ascii=False).encode("utf-8")
+
+
+def is_content_key(key):
+    """Whether the key has the suffix of one of the output formats."""
+    return key.endswith(tuple(suffix for suffix, _ in FORMATS.values()))
+
+
+def compress(data, content_encoding):
+    """Compresses data with gzip or zstd, or returns it unchanged."""
+    if content_encoding == "gzip":
+        return gzip.compress(data)
+    if content_encoding == "zstd":
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(data, content_encoding):
+    """Decompresses data with gzip or zstd, or returns it unchanged."""
+    if content_encoding == "gzip":
+        return gzip.decompress(data)
+    if content_encoding == "zstd":
+        return _zstd().ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def _zstd():
+    """The zstandard module, which is only needed for zstd content."""
+    if zstandard is None:
+        raise ValueError("The zstandard package is required for zstd.")
+    return zstandard
@@ -1,20 +1,51 @@
 import logging
 import json
+import os
+import threading
+import time
 from botocore.exceptions import ClientError
-import boto3
+from aws_clients import get_client
+from metrics import timed
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-def get_api_key(secret_name) -> str:
+# Overridden to run against a local stand-in, e.g. benchmark/fake_guardian.py.
+GUARDIAN_API_URL = os.environ.get("GUARDIAN_API_URL",
+                                  "https://content.guardianapis.com")
+SECRET_CACHE_TTL = float(os.environ.get("SECRET_CACHE_TTL", "300"))
+STALE_WHILE_REVALIDATE = (
+    os.environ.get("SECRET_STALE_WHILE_REVALIDATE", "false").lower() == "true")
+
+_secret_cache = {}
+_refreshing = set()
+_cache_lock = threading.Lock()
+
+
+def get_api_key(secret_name,
+                ttl: float = None,
+                force_refresh: bool = False,
+                stale_while_revalidate: bool = None) -> str:
     """
     Gets the Guardian API key from AWS Secrets Manager.
+    The key is cached in the Lambda container, so warm invocations
+    do not call Secrets Manager until the cached key expires.
 
     Parameters
     ----------
     secret_name : str (required)
         The name of the secret in AWS Secrets Manager.
+    ttl : float (optional)
+        Seconds a cached key is used for.
+        Defaults to the SECRET_CACHE_TTL environment variable, or 300.
+    force_refresh : bool (optional)
+        Fetches the key even if a cached key is still valid,
+        e.g. after the Guardian API rejected the cached key.
+    stale_while_revalidate : bool (optional)
+        Returns an expired key straight away and refreshes it in the
+        background. Defaults to the SECRET_STALE_WHILE_REVALIDATE
+        environment variable.
 
     Raises
     ------
@@ -26,12 +57,45 @@ def get_api_key(secret_name) -> str:
     str
         The Guardian API key.
     """
+    ttl = SECRET_CACHE_TTL if ttl is None else ttl
+    if stale_while_revalidate is None:
+        stale_while_revalidate = STALE_WHILE_REVALIDATE
+
+    cached = _secret_cache.get(secret_name)
+    if cached is not None and not force_refresh:
+        api_key, fetched_at = cached
+        if time.monotonic() - fetched_at < ttl:
+            return api_key
+        if stale_while_revalidate:
+            refresh_api_key_in_background(secret_name)
+            return api_key
+
+    return fetch_api_key(secret_name)
+
+
+def fetch_api_key(secret_name) -> str:
+    """
+    Fetches the Guardian API key from AWS Secrets Manager,
+    and stores it in the cache used by get_api_key.
+
+    Parameters
+    ----------
+    secret_name : str (required)
+        The name of the secret in AWS Secrets Manager.
+
+    Returns
+    -------
+    str
+        The Guardian API key, or None if it could not be retrieved.
+    """
     try:
-        client = boto3.client("secretsmanager", region_name="eu-west-2")
-        response = client.get_secret_value(SecretId=secret_name)
+        client = get_client("secretsmanager", region_name="eu-west-2")
+        with timed("SecretFetch"):
+            response = client.get_secret_value(SecretId=secret_name)
         secret = json.loads(response['SecretString'])
 
         api_key = {"api_key": secret["api_key"]}
+        _secret_cache[secret_name] = (api_key["api_key"], time.monotonic())
 
         logger.info("API Key successfully returned.")
         return api_key["api_key"]
@@ -51,18 +115,59 @@ def get_api_key(secret_name) -> str:
             secret_name, e)
 
 
-def get_api_link(api_key: str, search_terms: dict) -> str:
+def refresh_api_key_in_background(secret_name) -> threading.Thread:
+    """
+    Starts fetching the key in a background thread,
+    unless a refresh of the same secret is already running.
+
+    Returns
+    -------
+    threading.Thread
+        The refresh thread, or None if a refresh was already running.
+    """
+    with _cache_lock:
+        if secret_name in _refreshing:
+            return None
+        _refreshing.add(secret_name)
+
+    def refresh():
+        try:
+            fetch_api_key(secret_name)
+        finally:
+            with _cache_lock:
+                _refreshing.discard(secret_name)
+
+    thread = threading.Thread(target=refresh, daemon=True)
+    thread.start()
+    return thread
+
+
+def clear_secret_cache():
+    """Removes all cached secrets."""
+    _secret_cache.clear()
+
+
+def get_api_link(search_terms: dict,
+                 show_fields: str = None,
+                 page_size: int = None,
+                 order_by: str = None) -> str:
     """
     This generates the API link for the Guardian API.
+    The link does not hold the API key, which get_content sends
+    in the api-key header.
 
     Parameters
     ----------
-    api_key : str (required)
-        The Guardian API key.
-        Function get_api_key will provide the correct key.
     search_terms : dict (required)
         The search terms to be used in the API link.
-        Function read_s3_json will provide the correct search terms.
+        Function read_s3_ndjson will provide the correct search terms.
+    show_fields : str (optional)
+        The article fields to include in the search results, e.g. "body".
+        Lets get_content build the previews without a request per article.
+    page_size : int (optional)
+        The number of results per page, up to 200. The API default is 10.
+    order_by : str (optional)
+        "newest", "oldest" or "relevance".
 
     Raises
     ------
@@ -74,4 +179,11 @@ def get_api_link(api_key: str, search_terms: dict) -> str:
         The API link for the Guardian API.
     """
 
-    return f"https://content.guardianapis.com/search?q={search_terms['search_term']}&from-date={search_terms['date_from']}&api-key={api_key}" # noqa E501
+    api_link = f"{GUARDIAN_API_URL}/search?q={search_terms['search_term']}&from-date={search_terms['date_from']}" # noqa E501
+    if show_fields:
+        api_link += f"&show-fields={show_fields}"
+    if page_size:
+        api_link += f"&page-size={page_size}"
+    if order_by:
+        api_link += f"&order-by={order_by}"
+    return api_link
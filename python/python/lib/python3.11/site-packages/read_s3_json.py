@@ -1,34 +1,46 @@
 import logging
 import json
-import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
+from aws_clients import get_client
+from metrics import record_metric, timed
 
 logger = logging.getLogger('MyLogger')
 logger.setLevel(logging.INFO)
 
+CHUNK_SIZE = int(os.environ.get("S3_READ_CHUNK_SIZE", str(64 * 1024)))
 
-def read_s3_json(event):
+
+def read_s3_ndjson(event, chunk_size=CHUNK_SIZE):
     """
-    Reads a JSON file from an S3 bucket (Raw data from user input).
+    Reads a newline-delimited JSON file from an S3 bucket
+    (a batch of raw data from user input).
     This is invoked whenever there is a PutObject event.
 
+    The object is streamed in chunks of chunk_size bytes,
+    and each search is parsed and yielded as soon as its line is complete,
+    so large batches are never held in memory at once.
+    A line that is not valid JSON is logged and skipped, see skip_line,
+    so it does not lose the searches after it.
+
     Parameters
     ----------
     event : dict
         A valid S3 PutObject event.
-    context : object
-        A valid AWS lambda Python context object.
-        https://docs.aws.amazon.com/lambda/latest/dg/python-context.html
+    chunk_size : int (optional)
+        The number of bytes read from S3 at a time.
+        Defaults to the S3_READ_CHUNK_SIZE environment variable, or 64 KiB.
 
     Raises
     ------
     ClientError
         If there is an issue with reading the object from the S3 bucket.
 
-    Returns
-    -------
+    Yields
+    ------
     dict
-        The JSON file from the S3 bucket in dictionary type.
+        One dictionary per line of the JSON file.
     """
 
     try:
@@ -40,12 +52,21 @@ def read_s3_json(event):
             raise InvalidFileTypeError
         logger.info("File is a valid json file")
 
-        s3 = boto3.client('s3')
-        data = s3.get_object(Bucket=s3_bucket_name, Key=s3_object_name)
-        decoded_data = data['Body'].read().decode('utf-8')
-        json_data = json.loads(decoded_data)
+        s3 = get_client('s3')
+        with timed("S3Read"):
+            data = s3.get_object(Bucket=s3_bucket_name, Key=s3_object_name)
+        record_metric("S3ReadBytes", data['ContentLength'], "Bytes")
+        for number, line in enumerate(
+                data['Body'].iter_lines(chunk_size=chunk_size), start=1):
+            if not line.strip():
+                continue
+            try:
+                search = json.loads(line)
+            except ValueError as e:
+                skip_line(s3_object_name, number, e)
+                continue
+            yield search
         logger.info("Data has been successfully read from S3 bucket.")
-        return json_data
 
     except KeyError as k:
         logger.error("Error retrieving data, %s", k)
@@ -65,12 +86,57 @@ def read_s3_json(event):
         raise RuntimeError from e
 
 
+def skip_line(s3_object_name, number, error):
+    """Logs a line of a newline-delimited JSON file that is not JSON."""
+    logger.error("Line %s of %s is not valid JSON and was skipped: %s",
+                 number, s3_object_name, error)
+    record_metric("SkippedLines", 1)
+
+
 def get_object_path(records):
     """Extracts bucket and object references from Records field of event."""
     return records[0]['s3']['bucket']['name'], \
         records[0]['s3']['object']['key']
 
 
+def process_s3_records(records, process, max_workers):
+    """
+    Runs process on every record of an S3 event, in a bounded thread pool.
+
+    Parameters
+    ----------
+    records : list
+        The Records field of the event.
+    process : callable
+        Called with a single-record event and the record number
+        (starting from 1) for each record.
+    max_workers : int
+        The maximum number of records processed at the same time.
+
+    Returns
+    -------
+    list
+        One dictionary per record, in order, with the bucket and key,
+        and either the result of process or the error it raised.
+    """
+    def run(number, record):
+        result = {"bucket": record['s3']['bucket']['name'],
+                  "key": record['s3']['object']['key']}
+        try:
+            result["result"] = process({"Records": [record]}, number)
+        except Exception as e:
+            result["error"] = e
+        return result
+
+    if len(records) <= 1 or max_workers <= 1:
+        return [run(number, record)
+                for number, record in enumerate(records, start=1)]
+
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(records))) as executor:
+        return list(executor.map(run, range(1, len(records) + 1), records))
+
+
 class InvalidFileTypeError(Exception):
     """Traps error where file type is not json."""
     pass
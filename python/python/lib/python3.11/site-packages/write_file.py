@@ -1,7 +1,8 @@
 from datetime import datetime as dt
 import logging
-import json
-import boto3
+from aws_clients import get_client
+from content_formats import encode_content, get_suffix
+from metrics import record_metric, timed
 from botocore.exceptions import ClientError
 
 logging.basicConfig()
@@ -9,7 +10,8 @@ logger = logging.getLogger("transformation_lambda")
 logger.setLevel(logging.INFO)
 
 
-def write_file_to_s3(content):
+def write_file_to_s3(content, part=None, output_format=None,
+                     source_key=None):
     """
     Gets the content from the API, and stores it in the s3 bucket.
 
@@ -17,6 +19,18 @@ def write_file_to_s3(content):
     ----------
     content : dict (required)
         The content to be stored in the S3 bucket.
+    part : int or str (optional)
+        The position of the content within a batch of searches.
+        Added to the file name so that each search gets its own file.
+    output_format : str (optional)
+        The format of the file, see content_formats.
+        Defaults to the TRANSFORMED_OUTPUT_FORMAT environment variable,
+        or compact JSON.
+    source_key : str (optional)
+        The key of the ingested object holding the search.
+        The file is named after it, so the invocations transforming
+        different objects never overwrite each other's files.
+        Without it, the file is named after the current time.
 
     Raises
     -------
@@ -28,14 +42,22 @@ def write_file_to_s3(content):
     None
     """
 
-    client = boto3.client("s3")
+    client = get_client("s3")
     date = dt.now()
     year = date.year
     month = date.month
     day = date.day
     time = date.strftime("%H%M%S")
 
-    file_name = f"{year}-{month}-{day}-{time}-transformed-content.json"
+    suffix = get_suffix(output_format)
+    if source_key is not None:
+        stem = get_source_stem(source_key)
+    else:
+        stem = f"{year}-{month}-{day}-{time}"
+    if part is None:
+        file_name = f"{stem}-transformed-content{suffix}"
+    else:
+        file_name = f"{stem}-{part}-transformed-content{suffix}"
 
     try:
         if content is None:
@@ -43,17 +65,35 @@ def write_file_to_s3(content):
             raise Exception("No search terms provided.")
 
         else:
-            response = client.put_object(
-                Body=json.dumps(content,
-                                indent=4,
-                                ensure_ascii=False
-                                ).encode("utf-8"),
-                Bucket="streaming-data-transformed-data-bucket",
-                Key=file_name
-            )
+            body, content_encoding = encode_content(content, output_format)
+            extra_args = {}
+            if content_encoding is not None:
+                extra_args["ContentEncoding"] = content_encoding
+            with timed("S3Write"):
+                response = client.put_object(
+                    Body=body,
+                    Bucket="streaming-data-transformed-data-bucket",
+                    Key=file_name,
+                    **extra_args
+                )
+            record_metric("S3WriteBytes", len(body), "Bytes")
             if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
                 logger.info("Success. File %s saved.", file_name)
 
     except ClientError as e:
         logger.error(e)
         raise e
+
+
+def get_source_stem(source_key):
+    """
+    The start of the transformed file names of an ingested object:
+    its key without the extension and the "-search-terms" ending,
+    e.g. "2023-1-1-173019-shardId-000000000000-1" for
+    "2023-1-1-173019-shardId-000000000000-1-search-terms.json".
+    """
+    stem = source_key.replace("/", "-")
+    for ending in [".json", ".ndjson", "-search-terms"]:
+        if stem.endswith(ending):
+            stem = stem[:-len(ending)]
+    return stem
@@ -1,20 +1,34 @@
 import base64
+import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
-import boto3
 from botocore.exceptions import ClientError
+from aws_clients import get_client
+from metrics import emit_metrics, record_metric, timed
 
 logging.basicConfig()
 logger = logging.getLogger("ingestion_lambda")
 logger.setLevel(logging.INFO)
 
+# "ndjson" writes the whole batch as one newline-delimited JSON object,
+# "sharded" writes one object per record, in parallel.
+BATCH_MODE = os.environ.get("INGESTION_BATCH_MODE", "ndjson")
+MAX_WORKERS = int(os.environ.get("INGESTION_MAX_WORKERS", "10"))
 
+
+@emit_metrics("ingestion")
 def ingestion_handler(event, context):
     """
     This function is used to ingest data from the Kinesis stream
     and save it to an S3 bucket.
     It does this using event source mapping.
 
+    Every record in the batch is saved. Depending on INGESTION_BATCH_MODE,
+    the records are written as a single newline-delimited JSON object,
+    or in parallel as one object per record, keyed by sequence number.
+
     Parameters
     ----------
     event : dict
@@ -24,7 +38,10 @@ def ingestion_handler(event, context):
 
     Returns
     -------
-    None
+    dict
+        The batchItemFailures holding the sequence numbers of the records
+        that could not be saved, so that only those records are retried.
+        Records that cannot be decoded are logged and dropped instead.
 
     Raises
     ------
@@ -34,7 +51,7 @@ def ingestion_handler(event, context):
         If there is an error during the processing of the event.
     """
 
-    client = boto3.client("s3")
+    client = get_client("s3")
     bucket_name = "streaming-data-ingested-data-bucket"
 
     date = dt.now()
@@ -42,28 +59,178 @@ def ingestion_handler(event, context):
     month = date.month
     day = date.day
     time = date.strftime("%H%M%S")
-    file_name = f"{year}-{month}-{day}-{time}-search-terms.json"
 
-    for record in event['Records']:
+    try:
+        if BATCH_MODE == "sharded":
+            failed = put_sharded_records(
+                client, bucket_name, f"{year}-{month}-{day}-{time}",
+                event['Records'])
+        else:
+            failed = put_ndjson_records(
+                client, bucket_name,
+                f"{year}-{month}-{day}-{time}-"
+                f"{get_batch_id(event['Records'])}-search-terms.json",
+                event['Records'])
+
+    except ClientError as ce:
+        logger.error("Error: %s", ce.response["Error"]["Message"])
+        raise ce
+    except Exception as e:
+        logger.error("An error occurred %s", e)
+        raise e
+
+    if failed:
+        logger.error("Failed to process %s records.", len(failed))
+    logger.info("Successfully processed %s records.",
+                len(event['Records']) - len(failed))
+
+    return {"batchItemFailures": [
+        {"itemIdentifier": sequence_number} for sequence_number in failed]}
+
+
+def get_batch_id(records):
+    """
+    Identifies a batch by the shard and sequence number of its first
+    record, so the batches of concurrent invocations, e.g. one per shard,
+    never overwrite each other.
+    """
+    if not records:
+        return "empty"
+    shard_id = records[0]['eventID'].split(":")[0]
+    return f"{shard_id}-{records[0]['kinesis']['sequenceNumber']}"
+
+
+def decode_record(record):
+    """
+    Decodes the data of a single Kinesis record, and writes its JSON
+    back on a single line, so that a record spanning several lines
+    cannot break the newline-delimited JSON file of its batch.
+
+    Raises
+    ------
+    ValueError
+        If the data is not base64, UTF-8 or JSON.
+    """
+    logger.info("Processed Kinesis Event - EventID: %s", record['eventID'])
+    data = base64.b64decode(record['kinesis']['data']).decode('utf-8')
+    logger.info("Record Data: %s", data)
+    return json.dumps(json.loads(data))
+
+
+def drop_record(record, error):
+    """
+    Logs a record that cannot be decoded, instead of reporting it in
+    batchItemFailures: it would fail again on every retry, holding up
+    its shard until the record expires.
+    """
+    logger.error("Record %s cannot be decoded and was dropped: %s",
+                 record['kinesis']['sequenceNumber'], error)
+    record_metric("DroppedRecords", 1)
+
+
+def put_ndjson_records(client, bucket_name, file_name, records):
+    """
+    Writes the records to a single newline-delimited JSON object.
+    Records that cannot be decoded are dropped, see drop_record.
+
+    Parameters
+    ----------
+    client : S3.Client
+        The S3 client.
+    bucket_name : str
+        The bucket the records are written to.
+    file_name : str
+        The key of the object, unique to the batch, see get_batch_id.
+    records : list
+        The Kinesis records of the event.
+
+    Returns
+    -------
+    list
+        The sequence numbers of the records that could not be saved,
+        and may be saved by a retry.
+    """
+    lines = []
+    for record in records:
         try:
-            logger.info("Processed Kinesis Event - EventID: {%s['eventID']}",
-                        record)
-            data = base64.b64decode(record['kinesis']['data']).decode('utf-8')
-            logger.info("Record Data: %s", data)
-            response = client.put_object(
-                Body=data,
-                Bucket=bucket_name,
-                Key=file_name
-            )
-            if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-                logger.info("Success. File %s saved, in bucket: %s.",
-                            file_name, bucket_name)
+            lines.append(decode_record(record))
+        except ValueError as e:
+            drop_record(record, e)
 
+    if lines:
+        try:
+            put_file(client, bucket_name, file_name, "\n".join(lines) + "\n")
         except ClientError as ce:
             logger.error("Error: %s", ce.response["Error"]["Message"])
-            raise ce
-        except Exception as e:
-            logger.error("An error occurred %s", e)
-            raise e
+            return [record['kinesis']['sequenceNumber']
+                    for record in records]
+    return []
+
+
+def put_sharded_records(client, bucket_name, prefix, records,
+                        max_workers=MAX_WORKERS):
+    """
+    Writes each record to its own object, using a bounded thread pool.
+    The key of each object holds the record's sequence number,
+    so records never overwrite each other.
+    Records that cannot be decoded are dropped, see drop_record.
+
+    Parameters
+    ----------
+    client : S3.Client
+        The S3 client.
+    bucket_name : str
+        The bucket the records are written to.
+    prefix : str
+        The start of each object key, e.g. the date.
+    records : list
+        The Kinesis records of the event.
+    max_workers : int (optional)
+        The maximum number of uploads running at the same time.
+
+    Returns
+    -------
+    list
+        The sequence numbers of the records that could not be saved,
+        and may be saved by a retry.
+    """
+    def put_record(record):
+        sequence_number = record['kinesis']['sequenceNumber']
+        file_name = f"{prefix}-{sequence_number}-search-terms.json"
+        put_file(client, bucket_name, file_name, decode_record(record))
+
+    if not records:
+        return []
+
+    with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(records)))) as executor:
+        futures = [executor.submit(put_record, record) for record in records]
+
+    failed = []
+    for record, future in zip(records, futures):
+        error = future.exception()
+        if isinstance(error, ValueError):
+            drop_record(record, error)
+        elif error is not None:
+            sequence_number = record['kinesis']['sequenceNumber']
+            logger.error("Record %s was not saved: %s",
+                         sequence_number, error)
+            failed.append(sequence_number)
+
+    logger.info("Saved %s of %s records.",
+                len(records) - len(failed), len(records))
+    return failed
+
 
-    logger.info("Successfully processed %s records.", len(event['Records']))
+def put_file(client, bucket_name, file_name, data):
+    """Writes data to the S3 bucket under file_name."""
+    with timed("S3Write"):
+        response = client.put_object(
+            Body=data,
+            Bucket=bucket_name,
+            Key=file_name
+        )
+    record_metric("S3WriteBytes", len(data.encode("utf-8")), "Bytes")
+    if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
+        logger.info("Success. File %s saved, in bucket: %s.",
+                    file_name, bucket_name)
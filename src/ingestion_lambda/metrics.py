@@ -0,0 +1,127 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE",
+                                   "StreamingDataProject")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+# CloudWatch accepts up to 100 values per metric in each document.
+MAX_VALUES = 100
+
+_metrics = defaultdict(list)
+_units = {}
+_metrics_lock = threading.Lock()
+
+
+def record_metric(name: str, value: float, unit: str = "Count") -> None:
+    """
+    Records a value of a metric, emitted by flush_metrics.
+
+    Parameters
+    ----------
+    name : str (required)
+        The metric name, e.g. "S3ReadBytes".
+    value : float (required)
+        The value.
+    unit : str (optional)
+        A CloudWatch unit, e.g. "Milliseconds", "Bytes" or "Count".
+    """
+    if not METRICS_ENABLED:
+        return
+    with _metrics_lock:
+        _metrics[name].append(value)
+        _units[name] = unit
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Records the duration of a block, or of every call of a function
+    when used as a decorator, as the metric f"{name}Duration",
+    in milliseconds.
+
+        with timed("S3Read"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_metric(f"{name}Duration",
+                      (time.perf_counter() - start) * 1000, "Milliseconds")
+
+
+def flush_metrics(function_name: str) -> list:
+    """
+    Prints the recorded metrics to stdout in CloudWatch Embedded Metric
+    Format, which CloudWatch Logs turns into metrics, and clears them.
+
+    Parameters
+    ----------
+    function_name : str (required)
+        The value of the Function dimension.
+
+    Returns
+    -------
+    list
+        The documents printed.
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+        units = dict(_units)
+        _metrics.clear()
+        _units.clear()
+    if not metrics:
+        return []
+
+    documents = []
+    longest = max(len(values) for values in metrics.values())
+    for start in range(0, longest, MAX_VALUES):
+        chunk = {name: values[start:start + MAX_VALUES]
+                 for name, values in metrics.items()
+                 if values[start:start + MAX_VALUES]}
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Function"]],
+                    "Metrics": [{"Name": name, "Unit": units[name]}
+                                for name in chunk],
+                }],
+            },
+            "Function": function_name,
+            **chunk,
+        }
+        print(json.dumps(document), flush=True)
+        documents.append(document)
+    return documents
+
+
+def clear_metrics() -> None:
+    """Discards the recorded metrics."""
+    with _metrics_lock:
+        _metrics.clear()
+        _units.clear()
+
+
+def emit_metrics(function_name: str):
+    """
+    Decorates a Lambda handler, recording the duration of the invocation
+    and flushing the metrics when it returns or raises.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            try:
+                with timed("Invocation"):
+                    return handler(event, context)
+            finally:
+                if METRICS_ENABLED:
+                    flush_metrics(function_name)
+        return wrapper
+    return decorator
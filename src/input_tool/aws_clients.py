@@ -0,0 +1,46 @@
+import threading
+import boto3
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str,
+               region_name: str = None,
+               endpoint_url: str = None):
+    """
+    Returns a boto3 client, creating it on first use.
+    Clients are kept for the life of the Lambda container,
+    so warm invocations skip the client construction.
+
+    Parameters
+    ----------
+    service_name : str (required)
+        The name of the AWS service, e.g. "s3".
+    region_name : str (optional)
+        The AWS region of the client.
+    endpoint_url : str (optional)
+        The endpoint of the client, e.g. a local stand-in for the service.
+
+    Returns
+    -------
+    botocore.client.BaseClient
+        The client for the (service, region, endpoint) combination.
+    """
+    key = (service_name, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(service_name,
+                                      region_name=region_name,
+                                      endpoint_url=endpoint_url)
+                _clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Removes all cached clients, e.g. between moto mocked tests."""
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,110 @@
+import csv
+import json
+import time
+from datetime import datetime
+from input_tool.put_record_util import KinesisProducer
+
+
+def bulk_input_tool(source,
+                    file_format="jsonl",
+                    progress_every=1000,
+                    producer=None):
+    """
+    Reads many searches from a CSV or JSONL source,
+    and writes them into the Amazon Kinesis data input stream in batches.
+    Searches with an invalid date are skipped and reported.
+
+    Parameters
+    ----------
+    source : file object
+        The searches, e.g. an open file or sys.stdin.
+        Each search has search_term, date_from and reference fields;
+        missing fields take the same defaults as user_input_tool.
+    file_format : str (optional)
+        "jsonl" (one JSON object per line) or "csv" (with a header row).
+    progress_every : int (optional)
+        The number of searches between progress messages.
+    producer : KinesisProducer (optional)
+        The producer used to write the searches.
+
+    Raises
+    ------
+    ClientError
+        If the request fails.
+
+    Returns
+    -------
+    dict
+        The number of searches submitted and skipped,
+        and the time taken in seconds.
+    """
+
+    start = time.perf_counter()
+    submitted = 0
+    skipped = 0
+
+    with (producer or KinesisProducer()) as producer:
+        for line_number, row in enumerate(
+                read_searches(source, file_format), start=1):
+            try:
+                record = validate_search(row)
+            except (ValueError, TypeError) as e:
+                print(f"Skipping search {line_number}: {e}")
+                skipped += 1
+                continue
+
+            producer.put(json.dumps(record).encode("utf-8"))
+            submitted += 1
+
+            if submitted % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Submitted {submitted} searches "
+                      f"({submitted / elapsed:.0f} searches/s).")
+
+    elapsed = time.perf_counter() - start
+    print(f"Submitted {submitted} searches in {elapsed:.2f}s "
+          f"({submitted / elapsed if elapsed else 0:.0f} searches/s), "
+          f"using {producer.api_calls} Kinesis requests.")
+    if skipped:
+        print(f"Skipped {skipped} invalid searches.")
+
+    return {"submitted": submitted, "skipped": skipped, "seconds": elapsed}
+
+
+def read_searches(source, file_format):
+    """Yields the searches of a CSV or JSONL source, one at a time."""
+    if file_format == "csv":
+        yield from csv.DictReader(source)
+    else:
+        for line in source:
+            if line.strip():
+                yield line
+
+
+def validate_search(row):
+    """
+    Builds the record for a single search, using the defaults
+    of user_input_tool for missing fields.
+
+    Raises
+    ------
+    ValueError
+        If the search is not a valid JSON object, a field is not a string,
+        or the date format is invalid.
+    """
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("A search must be a JSON object.")
+    for field in ["search_term", "date_from", "reference"]:
+        if not isinstance(row.get(field) or "", str):
+            raise ValueError(f"{field} must be a string.")
+
+    date_from = (row.get("date_from") or "").strip() or "2021-01-01"
+    datetime.strptime(date_from, "%Y-%m-%d")
+
+    return {"search_term": (row.get("search_term") or "").strip()
+            or "machine learning",
+            "date_from": date_from,
+            "reference": (row.get("reference") or "").strip()
+            or "guardian_content"}
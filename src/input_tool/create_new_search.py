@@ -1,12 +1,38 @@
+import argparse
+import sys
 from user_input_tool import user_input_tool
+from bulk_input_tool import bulk_input_tool
 
 
-def create_new_search():
+def create_new_search(argv=None):
     """
     This function allows the user to input their search terms
     into the pipeline.
+    Without arguments, the search is asked for interactively.
+    With --file, many searches are read from a CSV or JSONL file,
+    or from stdin when the file is "-".
     """
-    return user_input_tool()
+    parser = argparse.ArgumentParser(
+        description="Add searches to the streaming data pipeline.")
+    parser.add_argument(
+        "--file",
+        help="CSV or JSONL file of searches, or - to read from stdin.")
+    parser.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        help="Format of the searches. Defaults to the file extension.")
+    args = parser.parse_args(argv)
 
+    if args.file is None:
+        return user_input_tool()
 
-create_new_search()
+    file_format = args.format or (
+        "csv" if args.file.endswith(".csv") else "jsonl")
+    if args.file == "-":
+        return bulk_input_tool(sys.stdin, file_format)
+    with open(args.file, newline="", encoding="utf-8") as source:
+        return bulk_input_tool(source, file_format)
+
+
+if __name__ == "__main__":
+    create_new_search()
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import uuid
+
+# Kinesis maps the MD5 of a partition key onto a 128-bit hash key range,
+# which is split evenly between the shards of a new stream.
+HASH_KEY_SPACE = 2 ** 128
+
+
+class FixedPartitionKey:
+    """Sends every record with the same partition key, i.e. to one shard."""
+
+    def __init__(self, key="0"):
+        self.key = key
+
+    def __call__(self, data):
+        return {"PartitionKey": self.key}
+
+
+class HashPartitionKey:
+    """
+    Uses a hash of the search as partition key, so the same search
+    always goes to the same shard while different searches are spread out.
+    With field set, only that field of the JSON record is used,
+    e.g. "reference" to keep each reference on one shard.
+    """
+
+    def __init__(self, field=None):
+        self.field = field
+
+    def __call__(self, data):
+        value = data
+        if self.field is not None:
+            try:
+                value = str(json.loads(data)[self.field]).encode("utf-8")
+            except (ValueError, KeyError, TypeError):
+                value = data
+        return {"PartitionKey": hashlib.md5(value).hexdigest()}
+
+
+class RandomPartitionKey:
+    """Uses a random partition key for every record."""
+
+    def __call__(self, data):
+        return {"PartitionKey": uuid.uuid4().hex}
+
+
+class RoundRobinPartitionKey:
+    """Cycles through key_count partition keys."""
+
+    def __init__(self, key_count=16):
+        self._keys = itertools.cycle(str(i) for i in range(key_count))
+        self._lock = threading.Lock()
+
+    def __call__(self, data):
+        with self._lock:
+            return {"PartitionKey": next(self._keys)}
+
+
+class ExplicitHashKeyBalancer:
+    """
+    Cycles through the shards of the stream using explicit hash keys,
+    so each shard receives exactly the same number of records.
+    Assumes the hash key range is split evenly, as for a new stream.
+    """
+
+    def __init__(self, shard_count):
+        width = HASH_KEY_SPACE // shard_count
+        self._hash_keys = itertools.cycle(
+            str(i * width + width // 2) for i in range(shard_count))
+        self._lock = threading.Lock()
+
+    def __call__(self, data):
+        with self._lock:
+            return {"PartitionKey": "0",
+                    "ExplicitHashKey": next(self._hash_keys)}
+
+
+STRATEGIES = {
+    "fixed": FixedPartitionKey,
+    "hash": HashPartitionKey,
+    "random": RandomPartitionKey,
+    "round-robin": RoundRobinPartitionKey,
+    "balanced": ExplicitHashKeyBalancer,
+}
+
+
+def get_partition_key_strategy(name=None, **kwargs):
+    """
+    Creates a partition key strategy by name.
+
+    Parameters
+    ----------
+    name : str (optional)
+        One of "fixed", "hash", "random", "round-robin" or "balanced".
+        Defaults to the PARTITION_KEY_STRATEGY environment variable,
+        or "hash".
+    **kwargs
+        Passed to the strategy, e.g. shard_count for "balanced".
+        For "balanced", shard_count defaults to the SHARD_COUNT
+        environment variable, or 1.
+
+    Raises
+    ------
+    ValueError
+        If there is no strategy with that name.
+
+    Returns
+    -------
+    callable
+        Takes the record data (bytes), and returns the PartitionKey
+        and, for "balanced", the ExplicitHashKey of the record.
+    """
+    name = name or os.environ.get("PARTITION_KEY_STRATEGY", "hash")
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown partition key strategy: {name}.")
+    if name == "balanced":
+        kwargs.setdefault("shard_count",
+                          int(os.environ.get("SHARD_COUNT", "1")))
+    return STRATEGIES[name](**kwargs)
+
+
+def simulate_shard_distribution(strategy, records, shard_count):
+    """
+    Works out which shard each record would be sent to,
+    without calling Kinesis.
+
+    Parameters
+    ----------
+    strategy : callable
+        The partition key strategy.
+    records : iterable
+        The data records (bytes).
+    shard_count : int
+        The number of shards, with evenly split hash key ranges.
+
+    Returns
+    -------
+    list
+        The number of records sent to each shard.
+    """
+    counts = [0] * shard_count
+    for data in records:
+        keys = strategy(data)
+        if "ExplicitHashKey" in keys:
+            hash_key = int(keys["ExplicitHashKey"])
+        else:
+            partition_key = keys["PartitionKey"].encode("utf-8")
+            hash_key = int(hashlib.md5(partition_key).hexdigest(), 16)
+        counts[hash_key * shard_count // HASH_KEY_SPACE] += 1
+    return counts
+
+
+def format_shard_distribution(counts):
+    """Formats the per-shard record counts as a report."""
+    total = sum(counts)
+    mean = total / len(counts)
+    lines = [f"shardId-{i:012d}: {count} records "
+             f"({count / total if total else 0:.1%})"
+             for i, count in enumerate(counts)]
+    lines.append(f"Hottest shard: {max(counts) / mean if mean else 0:.2f}x "
+                 f"the mean of {mean:.1f} records.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Reports the shard distribution of a JSONL sample of searches."""
+    parser = argparse.ArgumentParser(
+        description="Simulate the per-shard distribution of searches.")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES),
+                        default="hash")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--file", default="-",
+                        help="JSONL file of searches, or - for stdin.")
+    args = parser.parse_args(argv)
+
+    kwargs = {}
+    if args.strategy == "balanced":
+        kwargs["shard_count"] = args.shards
+    strategy = get_partition_key_strategy(args.strategy, **kwargs)
+
+    if args.file == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(args.file, encoding="utf-8") as source:
+            lines = source.readlines()
+    records = [line.strip().encode("utf-8") for line in lines if line.strip()]
+    print(format_shard_distribution(
+        simulate_shard_distribution(strategy, records, args.shards)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
-import boto3
+import time
 from botocore.exceptions import ClientError
+from input_tool.aws_clients import get_client
+from input_tool.partition_keys import get_partition_key_strategy
 
+# Created once, so that stateful strategies such as round-robin
+# carry on between calls.
+PARTITION_KEY_STRATEGY = get_partition_key_strategy()
 
-def put_record(data):
+
+def put_record(data, partition_key_strategy=None):
     """
     Writes a single data record into the Amazon Kinesis data stream.
 
@@ -10,6 +16,9 @@ def put_record(data):
     ----------
     data : bytes
         The data record to be written into the stream.
+    partition_key_strategy : callable (optional)
+        Chooses the partition key of the record, see partition_keys.
+        Defaults to the PARTITION_KEY_STRATEGY environment variable.
 
     Raises
     ------
@@ -26,13 +35,14 @@ def put_record(data):
     if not isinstance(data, bytes):
         raise TypeError("Data must be the correct type: bytes.")
 
-    kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+    kinesis_client = get_client("kinesis", region_name="eu-west-2")
+    partition_key_strategy = partition_key_strategy or PARTITION_KEY_STRATEGY
 
     try:
         kinesis_client.put_record(
             StreamName="streaming_data_project_input",
             Data=data,
-            PartitionKey="0")
+            **partition_key_strategy(data))
 
     except ClientError as ce:
         print("Error: %s", ce.response["Error"]["Message"])
@@ -40,3 +50,161 @@ def put_record(data):
     except Exception as e:
         print("Error: %s", e)
         raise e
+
+
+class KinesisProducer:
+    """
+    Buffers data records and writes them into the Amazon Kinesis
+    data stream in batches, using put_records.
+
+    A batch is sent once it reaches max_records or max_bytes,
+    or when a record is put flush_interval seconds or more after the
+    last batch. There is no timer: the interval is only checked by put,
+    so buffered records wait for the next put, or for flush.
+    Records rejected by Kinesis are retried with exponential backoff.
+
+    Use it as a context manager so that the remaining records
+    are sent on exit:
+
+        with KinesisProducer() as producer:
+            for data in records:
+                producer.put(data)
+    """
+
+    MAX_RECORDS = 500
+    MAX_BYTES = 5 * 1024 * 1024
+    MAX_RECORD_BYTES = 1024 * 1024
+
+    def __init__(self,
+                 stream_name="streaming_data_project_input",
+                 max_records=MAX_RECORDS,
+                 max_bytes=MAX_BYTES,
+                 flush_interval=1.0,
+                 max_retries=5,
+                 backoff=0.1,
+                 partition_key_strategy=None,
+                 client=None):
+        """
+        Parameters
+        ----------
+        stream_name : str (optional)
+            The name of the Kinesis data stream.
+        max_records : int (optional)
+            The largest number of records sent in one put_records call.
+        max_bytes : int (optional)
+            The largest size of the records sent in one put_records call.
+        flush_interval : float (optional)
+            The time, in seconds, after the last batch from which put
+            sends the buffer. It is only checked on put, so it does not
+            bound how long a record stays buffered between puts.
+        max_retries : int (optional)
+            The number of times rejected records are sent again.
+        backoff : float (optional)
+            The wait, in seconds, before the first retry.
+            It doubles with each retry.
+        partition_key_strategy : callable (optional)
+            Chooses the partition key of each record, see partition_keys.
+            Defaults to the PARTITION_KEY_STRATEGY environment variable.
+        client : Kinesis.Client (optional)
+            The Kinesis client. Defaults to the shared client.
+        """
+        self.stream_name = stream_name
+        self.max_records = min(max_records, self.MAX_RECORDS)
+        self.max_bytes = min(max_bytes, self.MAX_BYTES)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.partition_key_strategy = (partition_key_strategy
+                                       or PARTITION_KEY_STRATEGY)
+        self.client = client or get_client("kinesis", region_name="eu-west-2")
+
+        self.records_sent = 0
+        self.api_calls = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def put(self, data):
+        """
+        Adds a data record to the buffer, sending a batch when it is full.
+
+        Parameters
+        ----------
+        data : bytes
+            The data record to be written into the stream.
+
+        Raises
+        ------
+        TypeError
+            If the data is not correctly formatted to bytes.
+        ValueError
+            If the record is larger than Kinesis allows.
+        """
+        if not isinstance(data, bytes):
+            raise TypeError("Data must be the correct type: bytes.")
+
+        record = {"Data": data, **self.partition_key_strategy(data)}
+        size = len(data) + len(record["PartitionKey"].encode("utf-8"))
+        if size > self.MAX_RECORD_BYTES:
+            raise ValueError("Record is larger than 1 MiB.")
+
+        if self._buffer_bytes + size > self.max_bytes:
+            self.flush()
+
+        self._buffer.append(record)
+        self._buffer_bytes += size
+
+        if (len(self._buffer) >= self.max_records
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Sends all buffered records.
+
+        Raises
+        ------
+        ClientError
+            If the request fails.
+        KinesisPutRecordsError
+            If some records are still rejected after max_retries.
+        """
+        records = self._buffer
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._last_flush = time.monotonic()
+        if records:
+            self._send(records)
+
+    def _send(self, records):
+        """Sends one batch, retrying the records that were rejected."""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            self.api_calls += 1
+            response = self.client.put_records(
+                StreamName=self.stream_name,
+                Records=records)
+
+            failed = [record for record, result
+                      in zip(records, response["Records"])
+                      if "ErrorCode" in result]
+            self.records_sent += len(records) - len(failed)
+            if not failed:
+                return
+            records = failed
+
+        raise KinesisPutRecordsError(
+            f"{len(records)} records were rejected by Kinesis.")
+
+
+class KinesisPutRecordsError(Exception):
+    """Traps error where Kinesis keeps rejecting records."""
+    pass
@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import time
+from metrics import record_metric, timed
+
+logger = logging.getLogger("loading_lambda")
+logger.setLevel(logging.INFO)
+
+# "article" sends one record per article,
+# "chunk" packs as many articles as fit into each record.
+SPLIT_MODE = os.environ.get("LOADING_SPLIT_MODE", "article")
+MAX_RECORD_BYTES = 1024 * 1024
+MAX_BATCH_RECORDS = 500
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+
+
+def split_content(content, correlation_id, mode=None,
+                  max_bytes=MAX_RECORD_BYTES):
+    """
+    Splits a transformed {"content": {...}} document into records.
+    Each record keeps the {"content": {...}} shape, holding some of the
+    articles, and adds the correlation_id, part and total,
+    so consumers can process the parts in parallel and reassemble them.
+
+    Parameters
+    ----------
+    content : bytes
+        The transformed JSON document.
+    correlation_id : str
+        The identifier shared by every part of the document.
+    mode : str (optional)
+        "article" or "chunk". Defaults to LOADING_SPLIT_MODE.
+    max_bytes : int (optional)
+        The largest size of a record.
+
+    Raises
+    ------
+    ValueError
+        If a single article is larger than max_bytes.
+
+    Returns
+    -------
+    list
+        The data of each record, in bytes.
+        Documents without a content dictionary are returned unchanged,
+        as a single record.
+    """
+    mode = mode or SPLIT_MODE
+    document = json.loads(content)
+    if not isinstance(document, dict) \
+            or not isinstance(document.get("content"), dict):
+        return [content]
+
+    articles = list(document["content"].items())
+    groups = []
+    for article in articles:
+        if mode == "chunk" and groups and _record_size(
+                correlation_id, groups[-1] + [article]) <= max_bytes:
+            groups[-1].append(article)
+        else:
+            groups.append([article])
+
+    records = []
+    for part, group in enumerate(groups, start=1):
+        record = _encode_record(correlation_id, group, part, len(groups))
+        if len(record) > max_bytes:
+            raise ValueError(
+                f"Part {part} of {correlation_id} is larger than "
+                f"{max_bytes} bytes.")
+        records.append(record)
+    return records
+
+
+def _encode_record(correlation_id, articles, part, total):
+    """Encodes the articles of a single part as JSON."""
+    return json.dumps({"correlation_id": correlation_id,
+                       "part": part,
+                       "total": total,
+                       "content": dict(articles)},
+                      ensure_ascii=False).encode("utf-8")
+
+
+def _record_size(correlation_id, articles):
+    """Size of a record, with room for the largest part and total."""
+    return len(_encode_record(correlation_id, articles,
+                              MAX_BATCH_RECORDS, MAX_BATCH_RECORDS))
+
+
+def put_records_in_batches(client, stream_name, records,
+                           partition_key_strategy,
+                           max_retries=5, backoff=0.1):
+    """
+    Writes the records into the Kinesis data stream using put_records,
+    in batches of up to 500 records and 5 MB.
+    Records rejected by Kinesis are retried with exponential backoff.
+
+    Parameters
+    ----------
+    client : Kinesis.Client
+        The Kinesis client.
+    stream_name : str
+        The name of the Kinesis data stream.
+    records : list
+        The data of each record, in bytes.
+    partition_key_strategy : callable
+        Chooses the partition key of each record, see partition_keys.
+    max_retries : int (optional)
+        The number of times rejected records are sent again.
+    backoff : float (optional)
+        The wait, in seconds, before the first retry.
+
+    Raises
+    ------
+    ClientError
+        If the request fails.
+    KinesisPutRecordsError
+        If some records are still rejected after max_retries.
+
+    Returns
+    -------
+    int
+        The number of put_records calls made.
+    """
+    batches = []
+    batch_bytes = 0
+    for data in records:
+        entry = {"Data": data, **partition_key_strategy(data)}
+        size = len(data) + len(entry["PartitionKey"].encode("utf-8"))
+        if not batches or len(batches[-1]) >= MAX_BATCH_RECORDS \
+                or batch_bytes + size > MAX_BATCH_BYTES:
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(entry)
+        batch_bytes += size
+
+    api_calls = 0
+    for batch in batches:
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+
+            api_calls += 1
+            with timed("KinesisPut"):
+                response = client.put_records(StreamName=stream_name,
+                                              Records=batch)
+            record_metric("KinesisPutRecords", len(batch))
+            record_metric("KinesisPutBytes",
+                          sum(len(entry["Data"]) for entry in batch), "Bytes")
+            if attempt:
+                record_metric("KinesisPutRetries", 1)
+            batch = [entry for entry, result
+                     in zip(batch, response["Records"])
+                     if "ErrorCode" in result]
+            if not batch:
+                break
+        else:
+            raise KinesisPutRecordsError(
+                f"{len(batch)} records were rejected by Kinesis.")
+
+    return api_calls
+
+
+class KinesisPutRecordsError(Exception):
+    """Traps error where Kinesis keeps rejecting records."""
+    pass
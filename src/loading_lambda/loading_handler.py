@@ -1,17 +1,34 @@
 import logging
-import boto3
+import os
 from botocore.exceptions import ClientError
-from read_transformed_s3_json import read_transformed_s3_json
+from aws_clients import get_client
+from load_to_kinesis import split_content, put_records_in_batches
+from metrics import emit_metrics
+from partition_keys import get_partition_key_strategy
+from profiling import profile_handler
+from read_transformed_s3_json import (read_transformed_s3_json,
+                                      get_object_path,
+                                      process_s3_records)
 
 logger = logging.getLogger("loading_lambda")
 logger.setLevel(logging.INFO)
 
+PARTITION_KEY_STRATEGY = get_partition_key_strategy()
+MAX_WORKERS = int(os.environ.get("LOADING_MAX_WORKERS", "4"))
 
+
+@emit_metrics("loading")
+@profile_handler("loading")
 def loading_handler(event, context):
     """
     This function is used to load data from an S3 bucket to a Kinesis stream.
     This is invoked whenever there is a PutObject event
     in the transformed S3 bucket.
+    Every object of the event is loaded, up to LOADING_MAX_WORKERS
+    objects at the same time.
+    The content is split into one record per article (or size-bounded
+    chunks, see LOADING_SPLIT_MODE), each holding the correlation id,
+    part and total, and sent in batches with put_records.
 
     Parameters
     ----------
@@ -22,34 +39,73 @@ def loading_handler(event, context):
 
     Returns
     -------
-    None
+    list
+        One dictionary per object, with the bucket, the key,
+        and the number of records written or the error.
 
     Raises
     ------
     ClientError
         If there is an error with the boto3 client connection.
+        Raised once every object of the event has been processed.
     Exception
         If there is an error during the processing of the event.
     """
 
     try:
-        kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+        results = process_s3_records(event['Records'], load_object,
+                                     MAX_WORKERS)
+    except Exception as e:
+        logger.error("Error whilst processing loading_handler: %s", e)
+        return None
 
-        content = read_transformed_s3_json(event)
+    client_error = None
+    for result in results:
+        error = result.pop("error", None)
+        if isinstance(error, ClientError):
+            logger.error("Error: %s", error.response["Error"]["Message"])
+            logger.error("Error: %s", error.response["Error"]['Code'])
+            client_error = client_error or error
+        elif error is not None:
+            logger.error("Error whilst processing loading_handler: %s", error)
+        result["records"] = result.pop("result", None)
+        result["error"] = None if error is None else str(error)
 
-        logger.info("Content has been successfully read.")
+    if client_error is not None:
+        raise client_error
+    return results
 
-        kinesis_client.put_record(
-            StreamName="streaming_data_project_output",
-            Data=content,
-            PartitionKey="0"
-        )
 
-        logger.info("Content has been successfully written to Kinesis.")
+def load_object(event, record_number=None):
+    """
+    Loads a single transformed S3 object into the Kinesis stream.
 
-    except ClientError as ce:
-        logger.error("Error: %s", ce.response["Error"]["Message"])
-        logger.error("Error: %s", ce.response["Error"]['Code'])
-        raise ce
-    except Exception as e:
-        logger.error("Error whilst processing loading_handler: %s", e)
+    Parameters
+    ----------
+    event : dict
+        An S3 PutObject event with a single record.
+    record_number : int (optional)
+        The position of the object within the event.
+
+    Returns
+    -------
+    int
+        The number of Kinesis records written.
+    """
+    kinesis_client = get_client("kinesis", region_name="eu-west-2")
+
+    content = read_transformed_s3_json(event)
+
+    logger.info("Content has been successfully read.")
+
+    s3_bucket_name, s3_object_name = get_object_path(event['Records'])
+    records = split_content(content, f"{s3_bucket_name}/{s3_object_name}")
+    logger.info("Content has been split into %s records.", len(records))
+
+    put_records_in_batches(kinesis_client,
+                           "streaming_data_project_output",
+                           records,
+                           PARTITION_KEY_STRATEGY)
+
+    logger.info("Content has been successfully written to Kinesis.")
+    return len(records)
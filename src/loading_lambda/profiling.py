@@ -0,0 +1,161 @@
+import functools
+import logging
+import os
+import random
+from datetime import datetime as dt
+from typing import TYPE_CHECKING
+from aws_clients import get_client
+
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+logger = logging.getLogger("profiling")
+logger.setLevel(logging.INFO)
+
+# The share of invocations profiled: 0 (default) never, 1 every one,
+# 0.01 one in a hundred.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOP_N = int(os.environ.get("PROFILING_TOP_N", "25"))
+# Profiles are logged, unless a bucket is set. It must not be one of the
+# pipeline's buckets, whose PutObject events trigger the lambdas.
+PROFILING_BUCKET = os.environ.get("PROFILING_BUCKET", "")
+
+
+def profile_handler(function_name: str):
+    """
+    Decorates a Lambda handler, profiling a sample of its invocations
+    with cProfile and tracemalloc, see PROFILING_SAMPLE_RATE.
+    Unsampled invocations only draw a random number,
+    and the profilers are only imported by sampled ones.
+
+    cProfile only sees the handler's thread, so the work of a thread
+    pool shows up as time spent waiting for its futures.
+
+    Parameters
+    ----------
+    function_name : str (required)
+        Names the profiles, e.g. "transformation".
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if (not PROFILING_SAMPLE_RATE
+                    or random.random() >= PROFILING_SAMPLE_RATE):
+                return handler(event, context)
+
+            import cProfile
+            import tracemalloc
+
+            profile = cProfile.Profile()
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            try:
+                return profile.runcall(handler, event, context)
+            finally:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if not tracing:
+                    tracemalloc.stop()
+                try:
+                    write_profile(function_name, context, profile,
+                                  snapshot, peak)
+                except Exception as e:
+                    logger.error("Could not write the profile: %s", e)
+        return wrapper
+    return decorator
+
+
+def format_profile(profile: "cProfile.Profile",
+                   snapshot: "tracemalloc.Snapshot",
+                   peak: int,
+                   top_n: int = PROFILING_TOP_N) -> str:
+    """
+    Summarises a profile.
+
+    Parameters
+    ----------
+    profile : cProfile.Profile (required)
+        The profile of the invocation.
+    snapshot : tracemalloc.Snapshot (required)
+        The memory allocated by the invocation, still in use at its end.
+    peak : int (required)
+        The peak traced memory, in bytes.
+    top_n : int (optional)
+        The number of functions and allocation sites listed.
+        Defaults to the PROFILING_TOP_N environment variable, or 25.
+
+    Returns
+    -------
+    str
+        The top_n functions by cumulative time, and the top_n lines
+        by memory allocated.
+    """
+    import io
+    import pstats
+    import tracemalloc
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats("cumulative").print_stats(top_n)
+
+    allocations = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__)
+    ]).statistics("lineno")
+    stream.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+    stream.write(f"Top {top_n} allocations:\n")
+    for allocation in allocations[:top_n]:
+        stream.write(f"{allocation}\n")
+    return stream.getvalue()
+
+
+def write_profile(function_name, context, profile, snapshot, peak,
+                  bucket=None):
+    """
+    Writes the pstats dump and the summary of a profile
+    under profiles/<function_name>/ in the bucket, or logs the summary
+    when no bucket is set.
+
+    Parameters
+    ----------
+    function_name : str (required)
+        Names the profiles, e.g. "transformation".
+    context : LambdaContext (required)
+        The runtime information of the invocation,
+        whose request id names the files.
+    profile : cProfile.Profile (required)
+        The profile of the invocation.
+    snapshot : tracemalloc.Snapshot (required)
+        The memory allocated by the invocation.
+    peak : int (required)
+        The peak traced memory, in bytes.
+    bucket : str (optional)
+        Defaults to the PROFILING_BUCKET environment variable.
+
+    Returns
+    -------
+    str
+        The key prefix of the files, or None when the summary is logged.
+    """
+    summary = format_profile(profile, snapshot, peak)
+    bucket = PROFILING_BUCKET if bucket is None else bucket
+    if not bucket:
+        logger.info("Profile of %s:\n%s", function_name, summary)
+        return None
+
+    request_id = getattr(context, "aws_request_id", None) or "local"
+    date = dt.now().strftime("%Y-%m-%d-%H%M%S")
+    prefix = f"profiles/{function_name}/{date}-{request_id}"
+    import marshal
+    import pstats
+
+    # The format of pstats.Stats.dump_stats, readable with pstats.Stats.
+    dump = marshal.dumps(pstats.Stats(profile).stats)
+
+    client = get_client("s3")
+    client.put_object(Bucket=bucket, Key=f"{prefix}.pstats", Body=dump)
+    client.put_object(Bucket=bucket, Key=f"{prefix}.txt",
+                      Body=summary.encode("utf-8"))
+    logger.info("Profile written to s3://%s/%s.", bucket, prefix)
+    return prefix
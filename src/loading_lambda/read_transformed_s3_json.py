@@ -1,6 +1,9 @@
 import logging
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
+from aws_clients import get_client
+from content_formats import decode_content, is_content_key
+from metrics import record_metric, timed
 
 logger = logging.getLogger("loading_lambda")
 logger.setLevel(logging.INFO)
@@ -10,6 +13,8 @@ def read_transformed_s3_json(event):
     """
     Reads a JSON file from an S3 bucket (Transformed data from user input).
     This is invoked whenever there is a PutObject event.
+    Compact JSON, NDJSON and compressed NDJSON files are read,
+    detecting the format from the key suffix or the Content-Encoding.
 
     Parameters
     ----------
@@ -34,13 +39,17 @@ def read_transformed_s3_json(event):
     try:
         s3_bucket_name, s3_object_name = get_object_path(event['Records'])
 
-        if s3_object_name[-4:] != 'json':
+        if not is_content_key(s3_object_name):
             logger.error("File %s is not a valid JSON file", s3_object_name)
             raise InvalidFileTypeError
 
-        s3 = boto3.client('s3')
-        data = s3.get_object(Bucket=s3_bucket_name, Key=s3_object_name)
-        contents = data['Body'].read()
+        s3 = get_client('s3')
+        with timed("S3Read"):
+            data = s3.get_object(Bucket=s3_bucket_name, Key=s3_object_name)
+            body = data['Body'].read()
+        record_metric("S3ReadBytes", len(body), "Bytes")
+        contents = decode_content(body, s3_object_name,
+                                  data.get('ContentEncoding'))
 
         return contents
 
@@ -68,6 +77,44 @@ def get_object_path(records):
         records[0]['s3']['object']['key']
 
 
+def process_s3_records(records, process, max_workers):
+    """
+    Runs process on every record of an S3 event, in a bounded thread pool.
+
+    Parameters
+    ----------
+    records : list
+        The Records field of the event.
+    process : callable
+        Called with a single-record event and the record number
+        (starting from 1) for each record.
+    max_workers : int
+        The maximum number of records processed at the same time.
+
+    Returns
+    -------
+    list
+        One dictionary per record, in order, with the bucket and key,
+        and either the result of process or the error it raised.
+    """
+    def run(number, record):
+        result = {"bucket": record['s3']['bucket']['name'],
+                  "key": record['s3']['object']['key']}
+        try:
+            result["result"] = process({"Records": [record]}, number)
+        except Exception as e:
+            result["error"] = e
+        return result
+
+    if len(records) <= 1 or max_workers <= 1:
+        return [run(number, record)
+                for number, record in enumerate(records, start=1)]
+
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(records))) as executor:
+        return list(executor.map(run, range(1, len(records) + 1), records))
+
+
 class InvalidFileTypeError(Exception):
     """Traps error where file type is not json."""
     pass
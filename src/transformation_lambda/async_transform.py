@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from get_api_utils import get_api_key
+from read_s3_json import read_s3_ndjson
+from write_file import write_file_to_s3
+
+logger = logging.getLogger("transformation_lambda")
+logger.setLevel(logging.INFO)
+
+# The number of searches transformed at the same time, across all objects.
+MAX_CONCURRENCY = int(os.environ.get("TRANSFORMATION_ASYNC_CONCURRENCY", "8"))
+
+
+async def transform_records_async(records,
+                                  transform_search,
+                                  max_concurrency=MAX_CONCURRENCY):
+    """
+    Transforms every search of every object of an S3 event,
+    overlapping all the independent I/O: the API key is fetched while the
+    objects are read, and the searches of every object are transformed
+    and written concurrently, each as soon as its line has been read.
+
+    boto3 and the Guardian session are blocking, so each call runs
+    in a thread pool, while asyncio schedules them.
+
+    Parameters
+    ----------
+    records : list
+        The Records field of the event.
+    transform_search : callable
+        Returns the content of a single search,
+        e.g. transformation_handler.transform_search_terms.
+    max_concurrency : int (optional)
+        The maximum number of searches transformed at the same time.
+        Defaults to the TRANSFORMATION_ASYNC_CONCURRENCY environment
+        variable, or 8.
+
+    Returns
+    -------
+    list
+        One dictionary per record, in order, with the bucket and key,
+        and either the number of searches transformed or the error,
+        as returned by read_s3_json.process_s3_records.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency + 1) as executor:
+        def run(function, *args):
+            return loop.run_in_executor(executor, partial(function, *args))
+
+        # Fills the API key cache while the objects are read. Errors are
+        # raised again by the searches, which fetch the key themselves.
+        api_key = run(get_api_key, "guardian_api_key")
+
+        async def transform(search_terms, part, source_key):
+            try:
+                await asyncio.wait([api_key])
+                content = await run(transform_search, search_terms)
+                await run(partial(write_file_to_s3, content, part,
+                                  source_key=source_key))
+            finally:
+                semaphore.release()
+
+        async def transform_object(record):
+            result = {"bucket": record['s3']['bucket']['name'],
+                      "key": record['s3']['object']['key']}
+            tasks = []
+            try:
+                # Streams the object, one line at a time, scheduling each
+                # search as it is read. Reading waits while
+                # max_concurrency searches are in flight, so an object is
+                # never held in memory at once. Looks one search ahead,
+                # as transform_object does, to name a single search's file.
+                searches = read_s3_ndjson({"Records": [record]})
+                search_terms = await run(next, searches, None)
+                count = 0
+                while search_terms is not None:
+                    following = await run(next, searches, None)
+                    count += 1
+                    part = None if count == 1 and following is None else count
+                    await semaphore.acquire()
+                    tasks.append(asyncio.create_task(
+                        transform(search_terms, part, result["key"])))
+                    search_terms = following
+                result["result"] = count
+            except Exception as e:
+                result["error"] = e
+
+            errors = await asyncio.gather(*tasks, return_exceptions=True)
+            for error in errors:
+                if error is not None and "error" not in result:
+                    del result["result"]
+                    result["error"] = error
+            return result
+
+        results = await asyncio.gather(*(
+            transform_object(record) for record in records))
+        await asyncio.gather(api_key, return_exceptions=True)
+
+    return list(results)
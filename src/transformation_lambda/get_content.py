@@ -1,14 +1,43 @@
 import logging
-import requests
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING
+from metrics import record_metric, timed
+from preview_cache import (get_preview_key,
+                           get_cached_preview,
+                           put_cached_preview)
+
+if TYPE_CHECKING:
+    import requests
 
 logging.basicConfig()
 logger = logging.getLogger("transformation_lambda")
 logger.setLevel(logging.INFO)
 
+MAX_WORKERS = int(os.environ.get("GUARDIAN_MAX_WORKERS", "10"))
+# Without a cap, only the first page of results is retrieved.
+MAX_RESULTS = int(os.environ.get("GUARDIAN_MAX_RESULTS", "0")) or None
+
 
-def get_content(api_link: str, api_key: str) -> dict:
+def get_content(api_link: str,
+                api_key: str,
+                max_workers: int = MAX_WORKERS,
+                session: "requests.Session" = None,
+                max_results: int = MAX_RESULTS) -> dict:
     """
-    This function retrieves the top 10 articles from the provided search terms.
+    This function retrieves the articles from the provided search terms.
+    Without max_results, this is the first page of results (10 articles,
+    unless the API link sets page-size). With max_results, the following
+    pages are fetched concurrently, and each page is added to the output
+    as soon as it arrives.
+    If the search was made with show-fields=body, the previews are taken
+    from the search results. Previews missing from the results are taken
+    from the preview cache, and only the remaining articles are
+    requested one by one.
+    The API key is sent in the api-key header of every request,
+    so it is never part of a URL that could be logged.
 
     Parameters
     ----------
@@ -17,7 +46,20 @@ def get_content(api_link: str, api_key: str) -> dict:
         Function get_api_link will provide the correct link.
 
     api_key : str (required)
-        The API key for the Guardian API.
+        The API key for the Guardian API, sent in the api-key header.
+
+    max_workers : int (optional)
+        The maximum number of article previews fetched at the same time.
+        Defaults to the GUARDIAN_MAX_WORKERS environment variable, or 10.
+        A value of 1 fetches the previews one after another.
+
+    session : requests.Session (optional)
+        The HTTP session used for the requests.
+        Defaults to the shared session in guardian_session.
+
+    max_results : int (optional)
+        The maximum number of articles retrieved.
+        Defaults to the GUARDIAN_MAX_RESULTS environment variable.
 
     Returns
     -------
@@ -27,27 +69,203 @@ def get_content(api_link: str, api_key: str) -> dict:
             webTitle : str
             webUrl : str
             content_preview : str
+
+    Raises
+    ------
+    GuardianAuthError
+        If the Guardian API rejects the API key.
     """
-    response = requests.get(api_link, timeout=750)
-    response_json = response.json()
-    results = response_json["response"]["results"]
+    session = session or get_session()
 
     data = {}
-    for i, result in enumerate(results):
-        data[i+1] = (
-            {
-                "webPublicationDate": result["webPublicationDate"],
-                "webTitle": result["webTitle"],
-                "webUrl": result["webUrl"],
-                "content_preview": get_content_preview(f"{result['apiUrl']}?show-elements=all&show-fields=body&api-key={api_key}") # noqa E501
-            }
-        )
+    for results in iter_search_pages(api_link, max_results, max_workers,
+                                     session, api_key):
+        previews = get_result_previews(results, api_key, max_workers, session)
+        for result, preview in zip(results, previews):
+            data[len(data) + 1] = (
+                {
+                    "webPublicationDate": result["webPublicationDate"],
+                    "webTitle": result["webTitle"],
+                    "webUrl": result["webUrl"],
+                    "content_preview": preview
+                }
+            )
 
     logger.info("Web content retrieved.")
     return {"content": data}
 
 
-def get_content_preview(webUrl: str) -> str:
+def iter_search_pages(api_link: str,
+                      max_results: int = None,
+                      max_workers: int = MAX_WORKERS,
+                      session: "requests.Session" = None,
+                      api_key: str = None):
+    """
+    Yields the results of a search, one page at a time and in order.
+    The first page gives the number of pages. The pages needed to reach
+    max_results are then fetched concurrently.
+
+    Parameters
+    ----------
+    api_link : str (required)
+        The API link for the Guardian API, without a page parameter.
+    max_results : int (optional)
+        The maximum number of results. Without it, only the first page
+        is retrieved.
+    max_workers : int (optional)
+        The maximum number of pages fetched at the same time.
+    session : requests.Session (optional)
+        The HTTP session used for the requests.
+    api_key : str (optional)
+        The API key for the Guardian API, sent in the api-key header.
+
+    Yields
+    ------
+    list
+        The results of a page.
+
+    Raises
+    ------
+    GuardianAuthError
+        If the Guardian API rejects the API key.
+    """
+    session = session or get_session()
+    first_page = get_search_page(api_link, session, api_key)
+    results = first_page["results"]
+    if max_results is None:
+        yield results
+        return
+
+    yield results[:max_results]
+    remaining = max_results - len(results)
+    page_size = first_page.get("pageSize") or len(results)
+    if remaining <= 0 or not page_size:
+        return
+
+    last_page = min(first_page.get("pages", 1),
+                    1 + math.ceil(remaining / page_size))
+    page_links = [f"{api_link}&page={page}"
+                  for page in range(2, last_page + 1)]
+    if not page_links:
+        return
+
+    logger.info("Fetching %s more pages of results.", len(page_links))
+    with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(page_links)))
+    ) as executor:
+        for page in executor.map(
+                partial(get_search_page, session=session,
+                        api_key=api_key),
+                page_links):
+            results = page["results"][:remaining]
+            remaining -= len(results)
+            yield results
+
+
+def get_search_page(api_link: str,
+                    session: "requests.Session" = None,
+                    api_key: str = None) -> dict:
+    """Retrieves a single page of search results."""
+    session = session or get_session()
+    with timed("GuardianSearch"):
+        response = session.get(api_link, headers=get_headers(api_key),
+                               timeout=750)
+    record_response_metrics("GuardianSearch", response)
+    check_api_key_accepted(response)
+    check_response_ok(response)
+    return response.json()["response"]
+
+
+def get_result_previews(results: list,
+                        api_key: str,
+                        max_workers: int = MAX_WORKERS,
+                        session: "requests.Session" = None) -> list:
+    """
+    Builds the previews of a page of search results.
+    Previews come from the search fields or the preview cache when
+    possible, and the remaining articles are fetched concurrently.
+
+    Returns
+    -------
+    list
+        The previews, in the same order as results.
+    """
+    previews = {}
+    missing = []
+    for i, result in enumerate(results):
+        body = result.get("fields", {}).get("body")
+        cache_key = get_preview_key(result)
+        if body is not None:
+            previews[i] = str(body[:1000])
+            if cache_key is not None:
+                # Came with the search, so only kept in memory.
+                put_cached_preview(cache_key, previews[i], path="", bucket="")
+            continue
+
+        preview = None if cache_key is None else get_cached_preview(cache_key)
+        if preview is None:
+            missing.append(i)
+        else:
+            previews[i] = preview
+
+    if missing:
+        logger.info("Fetching %s previews missing from the search results.",
+                    len(missing))
+        preview_urls = [
+            f"{results[i]['apiUrl']}?show-elements=all&show-fields=body"
+            for i in missing
+        ]
+        fetched = get_content_previews(preview_urls, max_workers, session,
+                                       api_key)
+        for i, preview in zip(missing, fetched):
+            previews[i] = preview
+            cache_key = get_preview_key(results[i])
+            if cache_key is not None:
+                put_cached_preview(cache_key, preview)
+
+    return [previews[i] for i in range(len(results))]
+
+
+def get_content_previews(webUrls: list,
+                         max_workers: int = MAX_WORKERS,
+                         session: "requests.Session" = None,
+                         api_key: str = None) -> list:
+    """
+    This function retrieves the previews of several articles concurrently.
+
+    Parameters
+    ----------
+    webUrls : list (required)
+        The apiURLs of the articles.
+        Function get_content will provide the correct URLs.
+
+    max_workers : int (optional)
+        The maximum number of previews fetched at the same time.
+
+    session : requests.Session (optional)
+        The HTTP session used for the requests.
+
+    api_key : str (optional)
+        The API key for the Guardian API, sent in the api-key header.
+
+    Returns
+    -------
+    list
+        The previews, in the same order as webUrls.
+    """
+    fetch_preview = partial(get_content_preview, session=session,
+                            api_key=api_key)
+    if max_workers <= 1 or len(webUrls) <= 1:
+        return [fetch_preview(webUrl) for webUrl in webUrls]
+
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(webUrls))) as executor:
+        return list(executor.map(fetch_preview, webUrls))
+
+
+def get_content_preview(webUrl: str,
+                        session: "requests.Session" = None,
+                        api_key: str = None) -> str:
     """
     This function retrieves the first 1000 characters of the article.
 
@@ -57,12 +275,92 @@ def get_content_preview(webUrl: str) -> str:
         The apiURL of the article.
         Function get_content will provide the correct URL.
 
+    session : requests.Session (optional)
+        The HTTP session used for the request.
+        Defaults to the shared session in guardian_session.
+
+    api_key : str (optional)
+        The API key for the Guardian API, sent in the api-key header.
+
     Returns
     -------
     str
         The first 1000 characters of the article.
     """
-    response = requests.get(webUrl, timeout=750)
+    session = session or get_session()
+    with timed("GuardianPreview"):
+        response = session.get(webUrl, headers=get_headers(api_key),
+                               timeout=750)
+    record_response_metrics("GuardianPreview", response)
+    check_api_key_accepted(response)
+    check_response_ok(response)
     response_json = response.json()
     content = response_json["response"]["content"]["fields"]["body"]
     return str(content[:1000])
+
+
+def get_session() -> "requests.Session":
+    """
+    Returns the shared session of guardian_session, importing it
+    (and requests) on first use, so that invocations sending no
+    Guardian request, e.g. answered from the search cache,
+    never import requests.
+    """
+    import guardian_session
+    return guardian_session.session
+
+
+def get_headers(api_key: str = None) -> dict:
+    """
+    Returns the headers of a Guardian request, with the API key.
+    The key is not put in the URL, which ends up in the messages of
+    connection errors and in urllib3's retry warnings.
+    """
+    return {"api-key": api_key} if api_key else {}
+
+
+def record_response_metrics(name: str, response: "requests.Response"):
+    """Records the size of a response, and how often it was retried."""
+    record_metric(f"{name}Bytes", len(response.content), "Bytes")
+    retries = getattr(response.raw, "retries", None)
+    record_metric(f"{name}Retries",
+                  len(retries.history) if retries is not None else 0)
+
+
+def check_api_key_accepted(response: "requests.Response"):
+    """Raises GuardianAuthError if the Guardian API rejected the API key."""
+    if response.status_code in (401, 403):
+        logger.error("Guardian API rejected the API key: %s",
+                     response.status_code)
+        raise GuardianAuthError(response.status_code)
+
+
+def check_response_ok(response: "requests.Response"):
+    """
+    Raises an error for a response that is still failing once the
+    session's retries are used up, instead of reading its error message
+    as content.
+
+    Raises
+    ------
+    GuardianThrottledError
+        If the Guardian API is still rate limiting the requests (429).
+    requests.HTTPError
+        For any other 4xx or 5xx response.
+    """
+    if response.status_code == 429:
+        logger.error("Guardian API is rate limiting the requests.")
+        raise GuardianThrottledError(
+            "The Guardian API rate limit was exceeded, "
+            "after retrying the request.")
+    response.raise_for_status()
+
+
+class GuardianAuthError(Exception):
+    """Traps error where the Guardian API rejects the API key."""
+    pass
+
+
+class GuardianThrottledError(Exception):
+    """Traps error where the Guardian API keeps answering with a 429."""
+    pass
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = int(os.environ.get("GUARDIAN_POOL_SIZE", "10"))
+RETRIES = int(os.environ.get("GUARDIAN_RETRIES", "3"))
+# Requests per second, burst size and requests per UTC day.
+# A rate or quota of 0 means no limit. A Guardian developer key
+# allows 1 request per second and 500 per day. Both are counted by
+# each Lambda container, so they do not enforce the limits of the key
+# across concurrent containers, and the quota restarts with every
+# cold start.
+RATE_LIMIT = float(os.environ.get("GUARDIAN_RATE_LIMIT", "0"))
+RATE_BURST = int(os.environ.get("GUARDIAN_RATE_BURST", "1"))
+DAILY_QUOTA = int(os.environ.get("GUARDIAN_DAILY_QUOTA", "0"))
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every thread sending Guardian requests,
+    with a counter of the requests sent on the current UTC day.
+    Tokens are added at rate per second, up to burst,
+    and each request waits until it can take one.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST,
+                 daily_quota=DAILY_QUOTA):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._day = None
+        self.requests_today = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Waits until a request may be sent.
+
+        Raises
+        ------
+        GuardianQuotaExceededError
+            If the daily quota has been used up.
+        """
+        with self._lock:
+            today = datetime.now(timezone.utc).date()
+            if today != self._day:
+                self._day = today
+                self.requests_today = 0
+            if self.daily_quota and self.requests_today >= self.daily_quota:
+                raise GuardianQuotaExceededError(
+                    f"The daily quota of {self.daily_quota} Guardian "
+                    "requests has been used.")
+            self.requests_today += 1
+
+            if not self.rate:
+                return
+            # Tokens may go below zero, reserving the next free slots
+            # so waiting threads are served in turn.
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens
+                               + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimitedRetry(Retry):
+    """
+    Retries that take a token from the rate limiter before each retry,
+    which urllib3 sends without going through the session.
+    """
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.rate_limiter = self.rate_limiter
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+
+class RateLimitedSession(requests.Session):
+    """A session taking a token from its rate limiter for every request."""
+
+    def __init__(self, rate_limiter=None):
+        super().__init__()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    def request(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super().request(*args, **kwargs)
+
+
+def create_session(pool_size: int = POOL_SIZE,
+                   retries: int = RETRIES,
+                   rate_limiter: RateLimiter = None) -> requests.Session:
+    """
+    Creates a keep-alive HTTP session for the Guardian API.
+
+    Parameters
+    ----------
+    pool_size : int (optional)
+        The number of connections kept open to the Guardian API.
+        Should be at least the number of concurrent preview requests.
+    retries : int (optional)
+        The number of times a failed GET request is retried,
+        with exponential backoff and jitter, on a connection error,
+        a 429 or a 5xx response. A 429 waits for its Retry-After header.
+        Each retry takes a token from the rate limiter, like a request.
+    rate_limiter : RateLimiter (optional)
+        Limits the requests sent with the session.
+        Defaults to a limiter using GUARDIAN_RATE_LIMIT,
+        GUARDIAN_RATE_BURST and GUARDIAN_DAILY_QUOTA.
+
+    Returns
+    -------
+    requests.Session
+        The session, with the pooled adapter mounted for https
+        (and http, for local stand-ins of the Guardian API).
+    """
+    session = RateLimitedSession(rate_limiter)
+    retry = RateLimitedRetry(
+        total=retries,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        rate_limiter=session.rate_limiter
+    )
+    adapter = HTTPAdapter(pool_connections=1,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Created at import, so warm Lambda invocations reuse the open connections
+# and every Guardian request of the container shares one rate limiter.
+session = create_session()
+
+
+class GuardianQuotaExceededError(Exception):
+    """Traps error where the daily quota of Guardian requests is used."""
+    pass
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from botocore.exceptions import ClientError
+from aws_clients import get_client
+
+logger = logging.getLogger("transformation_lambda")
+logger.setLevel(logging.INFO)
+
+PREVIEW_CACHE_SIZE = int(os.environ.get("PREVIEW_CACHE_SIZE", "1024"))
+# The persistent tiers are off when unset. A SQLite file in /tmp outlives
+# the invocation in a warm container, while S3 is shared by all of them.
+PREVIEW_CACHE_PATH = os.environ.get("PREVIEW_CACHE_PATH", "")
+PREVIEW_CACHE_BUCKET = os.environ.get("PREVIEW_CACHE_BUCKET", "")
+PREVIEW_CACHE_PREFIX = "preview-cache/"
+
+_preview_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_preview_key(result: dict) -> str:
+    """
+    Builds the cache key of an article from a search result,
+    using its Guardian content id and the time it was last modified,
+    so edited articles are fetched again.
+    Falls back on the publication date when lastModified was not requested.
+
+    Returns
+    -------
+    str
+        The cache key, or None if the result has no id.
+    """
+    if not result.get("id"):
+        return None
+    version = (result.get("fields", {}).get("lastModified")
+               or result.get("webPublicationDate", ""))
+    return f"{result['id']}/{version}"
+
+
+def get_cached_preview(key: str, path: str = None, bucket: str = None) -> str:
+    """
+    Looks up the preview of an article, first in the Lambda container,
+    then in the SQLite file and then in the S3 cache bucket.
+
+    Parameters
+    ----------
+    key : str (required)
+        The cache key from get_preview_key.
+    path : str (optional)
+        The SQLite file.
+        Defaults to the PREVIEW_CACHE_PATH environment variable.
+    bucket : str (optional)
+        The S3 cache bucket.
+        Defaults to the PREVIEW_CACHE_BUCKET environment variable.
+
+    Returns
+    -------
+    str
+        The cached preview, or None if there is none.
+    """
+    path = PREVIEW_CACHE_PATH if path is None else path
+    bucket = PREVIEW_CACHE_BUCKET if bucket is None else bucket
+
+    with _cache_lock:
+        if key in _preview_cache:
+            _preview_cache.move_to_end(key)
+            return _preview_cache[key]
+
+    preview = None
+    if path:
+        with _connect(path) as connection:
+            row = connection.execute(
+                "SELECT preview FROM previews WHERE key = ?",
+                (key,)).fetchone()
+        preview = row[0] if row else None
+
+    if preview is None and bucket:
+        try:
+            response = get_client("s3").get_object(
+                Bucket=bucket, Key=PREVIEW_CACHE_PREFIX + key)
+            preview = response["Body"].read().decode("utf-8")
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchKey":
+                logger.error("Error reading the preview cache: %s", e)
+
+    if preview is not None:
+        _store_in_memory(key, preview)
+    return preview
+
+
+def put_cached_preview(key: str,
+                       preview: str,
+                       path: str = None,
+                       bucket: str = None) -> None:
+    """
+    Stores the preview of an article in every tier of the cache.
+    Failing to write to S3 is logged, as the preview itself was retrieved.
+
+    Parameters
+    ----------
+    key : str (required)
+        The cache key from get_preview_key.
+    preview : str (required)
+        The first 1000 characters of the article.
+    path : str (optional)
+        The SQLite file.
+        Defaults to the PREVIEW_CACHE_PATH environment variable.
+    bucket : str (optional)
+        The S3 cache bucket.
+        Defaults to the PREVIEW_CACHE_BUCKET environment variable.
+    """
+    path = PREVIEW_CACHE_PATH if path is None else path
+    bucket = PREVIEW_CACHE_BUCKET if bucket is None else bucket
+    _store_in_memory(key, preview)
+
+    if path:
+        with _connect(path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO previews (key, preview) VALUES (?, ?)",
+                (key, preview))
+
+    if bucket:
+        try:
+            get_client("s3").put_object(
+                Body=preview.encode("utf-8"), Bucket=bucket,
+                Key=PREVIEW_CACHE_PREFIX + key)
+        except ClientError as e:
+            logger.error("Error writing the preview cache: %s", e)
+
+
+def clear_preview_cache() -> None:
+    """Empties the in-memory tier of the preview cache."""
+    with _cache_lock:
+        _preview_cache.clear()
+
+
+@contextmanager
+def _connect(path):
+    """Opens the SQLite file, creating the previews table if needed."""
+    import sqlite3
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS previews "
+                "(key TEXT PRIMARY KEY, preview TEXT NOT NULL)")
+            yield connection
+    finally:
+        connection.close()
+
+
+def _store_in_memory(key, preview):
+    """Adds an entry, evicting the least recently used ones."""
+    with _cache_lock:
+        _preview_cache[key] = preview
+        _preview_cache.move_to_end(key)
+        while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+            _preview_cache.popitem(last=False)
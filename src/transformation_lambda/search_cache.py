@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from aws_clients import get_client
+
+logger = logging.getLogger("transformation_lambda")
+logger.setLevel(logging.INFO)
+
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "128"))
+# The S3 tier is shared by every Lambda container, and is off when unset.
+SEARCH_CACHE_BUCKET = os.environ.get("SEARCH_CACHE_BUCKET", "")
+SEARCH_CACHE_PREFIX = "search-cache/"
+
+_search_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Held while a search is looked up and fetched, so identical searches
+# running at the same time call the Guardian API once. Each lock is
+# dropped once no search holds it.
+_search_locks = weakref.WeakValueDictionary()
+
+
+def get_search_key(search_terms: dict, **params) -> str:
+    """
+    Builds the cache key of a search, from the normalised query.
+    Searches differing only in case or whitespace share a key,
+    while the API key is left out so it survives key rotation.
+
+    Parameters
+    ----------
+    search_terms : dict (required)
+        The search terms read from the S3 bucket.
+    **params
+        Other query parameters changing the response,
+        e.g. show_fields or page_size.
+
+    Returns
+    -------
+    str
+        The SHA-256 of the normalised query.
+    """
+    query = {
+        "search_term": " ".join(
+            str(search_terms.get("search_term", "")).lower().split()),
+        "date_from": str(search_terms.get("date_from", "")).strip(),
+        **{name: value for name, value in params.items()
+           if value is not None},
+    }
+    return hashlib.sha256(
+        json.dumps(query, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_cached_search(key: str,
+                      ttl: float = None,
+                      bucket: str = None) -> dict:
+    """
+    Looks up the content of a search, first in the Lambda container
+    and then in the S3 cache bucket.
+
+    Parameters
+    ----------
+    key : str (required)
+        The cache key from get_search_key.
+    ttl : float (optional)
+        Seconds the content is used for.
+        Defaults to the SEARCH_CACHE_TTL environment variable, or 3600.
+    bucket : str (optional)
+        The S3 cache bucket.
+        Defaults to the SEARCH_CACHE_BUCKET environment variable.
+
+    Returns
+    -------
+    dict
+        The cached content, or None if there is none or it has expired.
+    """
+    ttl = SEARCH_CACHE_TTL if ttl is None else ttl
+    bucket = SEARCH_CACHE_BUCKET if bucket is None else bucket
+
+    with _cache_lock:
+        cached = _search_cache.get(key)
+        if cached is not None:
+            data, stored_at = cached
+            if time.time() - stored_at < ttl:
+                _search_cache.move_to_end(key)
+                return json.loads(data)
+            del _search_cache[key]
+
+    if not bucket:
+        return None
+
+    try:
+        response = get_client("s3").get_object(
+            Bucket=bucket, Key=SEARCH_CACHE_PREFIX + key + ".json")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            logger.error("Error reading the search cache: %s", e)
+        return None
+
+    stored_at = response["LastModified"].timestamp()
+    if datetime.now(timezone.utc).timestamp() - stored_at >= ttl:
+        return None
+
+    data = response["Body"].read()
+    _store_in_memory(key, data, stored_at)
+    return json.loads(data)
+
+
+def put_cached_search(key: str, content: dict, bucket: str = None) -> None:
+    """
+    Stores the content of a search in the Lambda container
+    and in the S3 cache bucket.
+    Failing to write to S3 is logged, as the search itself succeeded.
+
+    Parameters
+    ----------
+    key : str (required)
+        The cache key from get_search_key.
+    content : dict (required)
+        The content returned by get_content.
+    bucket : str (optional)
+        The S3 cache bucket.
+        Defaults to the SEARCH_CACHE_BUCKET environment variable.
+    """
+    bucket = SEARCH_CACHE_BUCKET if bucket is None else bucket
+    data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    _store_in_memory(key, data, time.time())
+
+    if bucket:
+        try:
+            get_client("s3").put_object(
+                Body=data, Bucket=bucket,
+                Key=SEARCH_CACHE_PREFIX + key + ".json")
+        except ClientError as e:
+            logger.error("Error writing the search cache: %s", e)
+
+
+def get_search_lock(key: str) -> threading.Lock:
+    """
+    Returns the lock of a search. Holding it around the cache lookup and
+    the Guardian request makes identical searches of a batch, running
+    concurrently, wait for the first one and then hit the cache.
+
+    Parameters
+    ----------
+    key : str (required)
+        The cache key from get_search_key.
+
+    Returns
+    -------
+    threading.Lock
+        The same lock for every caller holding a reference to it.
+    """
+    with _cache_lock:
+        lock = _search_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _search_locks[key] = lock
+        return lock
+
+
+def clear_search_cache() -> None:
+    """Empties the in-memory tier of the search cache."""
+    with _cache_lock:
+        _search_cache.clear()
+
+
+def _store_in_memory(key, data, stored_at):
+    """Adds an entry, evicting the least recently used ones."""
+    with _cache_lock:
+        _search_cache[key] = (data, stored_at)
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
@@ -1,8 +1,17 @@
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 from get_api_utils import get_api_key, get_api_link
-from get_content import get_content
-from read_s3_json import read_s3_json
+from get_content import get_content, GuardianAuthError, MAX_RESULTS
+from read_s3_json import read_s3_ndjson, process_s3_records
+from metrics import emit_metrics
+from profiling import profile_handler
+from search_cache import (get_search_key,
+                          get_cached_search,
+                          get_search_lock,
+                          put_cached_search)
 from write_file import write_file_to_s3
 
 
@@ -10,11 +19,30 @@ logging.basicConfig()
 logger = logging.getLogger("transformation_lambda")
 logger.setLevel(logging.INFO)
 
+MAX_WORKERS = int(os.environ.get("TRANSFORMATION_MAX_WORKERS", "4"))
+# "sync" processes the objects in a thread pool, "async" overlaps
+# every read, search and write with asyncio (see async_transform).
+TRANSFORMATION_MODE = os.environ.get("TRANSFORMATION_MODE", "sync")
+# Without "body", searches are smaller and the previews come from the
+# preview cache, fetching only the articles that are not cached.
+SHOW_FIELDS = os.environ.get("GUARDIAN_SHOW_FIELDS", "body,lastModified")
+PAGE_SIZE = int(os.environ.get("GUARDIAN_PAGE_SIZE", "0")) or None
+ORDER_BY = os.environ.get("GUARDIAN_ORDER_BY") or None
 
+
+@emit_metrics("transformation")
+@profile_handler("transformation")
 def transformation_handler(event, context):
     """
     Transforms the search terms from the S3 bucket with raw data,
     transforms them into news results.
+    Every object of the event is processed, up to
+    TRANSFORMATION_MAX_WORKERS objects at the same time, and their
+    searches share a pool of TRANSFORMATION_MAX_WORKERS threads.
+    With TRANSFORMATION_MODE set to "async", every read, search and write
+    is overlapped instead, see async_transform.
+    An object may hold a batch of searches, one JSON document per line.
+    Each search is written to its own file.
 
     Parameters
     ----------
@@ -25,34 +53,169 @@ def transformation_handler(event, context):
 
     Returns
     -------
-    None
+    list
+        One dictionary per object, with the bucket, the key,
+        and the number of searches transformed or the error.
 
     Raises
     ------
     ClientError
         If there is an error with the boto3 client connection.
+        Raised once every object of the event has been processed.
     Exception
         If there is an error during the processing of the event.
     """
 
     try:
-        search_terms = read_s3_json(event)
-        logger.info("Reading JSON file from S3 bucket: %s", search_terms)
+        records = event['Records']
 
-        api_key = get_api_key("guardian_api_key")
-        logger.info("Getting API key from AWS Secrets Manager: %s", api_key)
+        if TRANSFORMATION_MODE == "async":
+            # Imported here, so the sync mode never imports asyncio.
+            import asyncio
+            from async_transform import transform_records_async
+            results = asyncio.run(
+                transform_records_async(records, transform_search_terms))
+        else:
+            get_api_key("guardian_api_key")
+            logger.info("Got API key from AWS Secrets Manager.")
 
-        api_link = get_api_link(api_key, search_terms)
-        logger.info("Getting API link: %s", api_link)
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                slots = threading.BoundedSemaphore(MAX_WORKERS)
 
-        content = get_content(api_link, api_key)
-        logger.info("Getting content: %s", content)
+                def process(record_event, record_number):
+                    return transform_object(record_event, executor, slots)
 
-        write_file_to_s3(content)
-        logger.info("Content written to S3 bucket.")
+                results = process_s3_records(records, process, MAX_WORKERS)
 
     except ClientError as ce:
         logger.error("Error: %s", ce.response["Error"]["Message"])
         raise ce
     except Exception as e:
         logger.error("Error whilst processing JSON file: %s", e)
+        return None
+
+    client_error = None
+    for result in results:
+        error = result.pop("error", None)
+        if isinstance(error, ClientError):
+            logger.error("Error: %s", error.response["Error"]["Message"])
+            client_error = client_error or error
+        elif error is not None:
+            logger.error("Error whilst processing JSON file: %s", error)
+        result["searches"] = result.pop("result", None)
+        result["error"] = None if error is None else str(error)
+
+    if client_error is not None:
+        raise client_error
+    return results
+
+
+def transform_object(event, executor, slots):
+    """
+    Transforms every search of a single S3 object.
+    The searches are read one line at a time and submitted to the
+    executor as soon as they are read. Reading waits for one of the slots,
+    so only as many searches as there are slots are in flight at once,
+    across all objects, and an object is never held in memory at once.
+    The files are named after the object's key, see write_file_to_s3,
+    with the position of the search when the object holds several.
+
+    Parameters
+    ----------
+    event : dict
+        An S3 PutObject event with a single record.
+    executor : concurrent.futures.Executor
+        Runs the searches.
+    slots : threading.BoundedSemaphore
+        Bounds the number of searches submitted and not yet finished.
+
+    Raises
+    ------
+    Exception
+        The first error raised by a search, in the order of the object,
+        once every submitted search has finished.
+
+    Returns
+    -------
+    int
+        The number of searches transformed.
+    """
+    source_key = event['Records'][0]['s3']['object']['key']
+    searches = iter(read_s3_ndjson(event))
+    logger.info("Reading JSON file from S3 bucket.")
+
+    futures = []
+    try:
+        # Looks one search ahead, so an object holding a single search
+        # keeps the original file name without a part number.
+        search_terms = next(searches, None)
+        count = 0
+        while search_terms is not None:
+            following = next(searches, None)
+            count += 1
+            part = None if count == 1 and following is None else count
+            slots.acquire()
+            future = executor.submit(transform_search, search_terms, part,
+                                     source_key)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+            search_terms = following
+    finally:
+        # Waits for the searches already submitted, even if reading failed.
+        errors = [future.exception() for future in futures]
+
+    for error in errors:
+        if error is not None:
+            raise error
+    return count
+
+
+def transform_search(search_terms, part, source_key):
+    """Transforms a single search and writes its content to S3."""
+    logger.info("Search terms: %s", search_terms)
+    content = transform_search_terms(search_terms)
+    logger.info("Got %s articles.", len(content["content"]))
+    write_file_to_s3(content, part, source_key=source_key)
+    logger.info("Content written to S3 bucket.")
+
+
+def transform_search_terms(search_terms):
+    """
+    Retrieves the Guardian content for a single search.
+    Searches made before are served from the search cache,
+    without calling the Guardian API. An identical search running
+    at the same time is waited for, see get_search_lock.
+    If the API key has been rotated, the key is refreshed
+    and the search is retried once.
+
+    Parameters
+    ----------
+    search_terms : dict
+        The search terms read from the S3 bucket.
+
+    Returns
+    -------
+    dict
+        The content returned by get_content.
+    """
+    query = {"show_fields": SHOW_FIELDS,
+             "page_size": PAGE_SIZE,
+             "order_by": ORDER_BY}
+    cache_key = get_search_key(search_terms, max_results=MAX_RESULTS, **query)
+    with get_search_lock(cache_key):
+        content = get_cached_search(cache_key)
+        if content is not None:
+            logger.info("Search cache hit for %s.", cache_key)
+            return content
+
+        api_key = get_api_key("guardian_api_key")
+        api_link = get_api_link(search_terms, **query)
+        try:
+            content = get_content(api_link, api_key)
+        except GuardianAuthError:
+            logger.info("Refreshing API key from AWS Secrets Manager.")
+            api_key = get_api_key("guardian_api_key", force_refresh=True)
+            content = get_content(api_link, api_key)
+
+        put_cached_search(cache_key, content)
+    return content
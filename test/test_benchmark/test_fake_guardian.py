@@ -0,0 +1,115 @@
+import pytest
+import requests
+from fake_guardian import FakeGuardian
+
+
+@pytest.fixture
+def guardian():
+    with FakeGuardian(total_results=25) as guardian:
+        yield guardian
+
+
+class TestFakeGuardianSearch:
+    def test_search_returns_the_first_page(self, guardian):
+        response = requests.get(f"{guardian.url}/search",
+                                params={"q": "test", "page-size": 10})
+
+        assert response.status_code == 200
+        page = response.json()["response"]
+        assert page["total"] == 25
+        assert page["pages"] == 3
+        assert page["currentPage"] == 1
+        assert [r["id"] for r in page["results"]] == [
+            f"test/{i}" for i in range(10)]
+
+    def test_search_returns_the_last_page(self, guardian):
+        response = requests.get(
+            f"{guardian.url}/search",
+            params={"q": "test", "page-size": 10, "page": 3})
+
+        page = response.json()["response"]
+        assert page["startIndex"] == 21
+        assert [r["id"] for r in page["results"]] == [
+            f"test/{i}" for i in range(20, 25)]
+
+    def test_page_past_the_last_is_a_bad_request(self, guardian):
+        response = requests.get(
+            f"{guardian.url}/search",
+            params={"q": "test", "page-size": 10, "page": 4})
+
+        assert response.status_code == 400
+        assert response.json()["response"]["status"] == "error"
+
+    def test_bodies_are_only_returned_when_requested(self, guardian):
+        without = requests.get(f"{guardian.url}/search",
+                               params={"q": "test"}).json()
+        with_body = requests.get(f"{guardian.url}/search",
+                                 params={"q": "test",
+                                         "show-fields": "body"}).json()
+
+        assert "body" not in without["response"]["results"][0]["fields"]
+        assert len(with_body["response"]["results"][0]["fields"]["body"]) \
+            == 5000
+
+    def test_article_is_served_from_its_api_url(self, guardian):
+        search = requests.get(f"{guardian.url}/search",
+                              params={"q": "test"}).json()
+        api_url = search["response"]["results"][0]["apiUrl"]
+
+        response = requests.get(api_url, params={"show-fields": "body"})
+
+        content = response.json()["response"]["content"]
+        assert content["id"] == "test/0"
+        assert len(content["fields"]["body"]) == 5000
+
+
+class TestFakeGuardianErrors:
+    def test_throttled_requests_get_a_retry_after(self):
+        with FakeGuardian(throttle_rate=1, retry_after=7) as guardian:
+            response = requests.get(f"{guardian.url}/search",
+                                    params={"q": "test"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "7"
+        assert guardian.statuses == {429: 1}
+
+    def test_injected_server_errors(self):
+        with FakeGuardian(error_rate=1) as guardian:
+            response = requests.get(f"{guardian.url}/search",
+                                    params={"q": "test"})
+
+        assert response.status_code == 503
+        assert guardian.statuses == {503: 1}
+
+    def test_rate_limit_is_counted_per_api_key(self):
+        with FakeGuardian(rate_limit=0.1) as guardian:
+            statuses = [
+                requests.get(f"{guardian.url}/search",
+                             params={"q": "test"},
+                             headers={"api-key": key}).status_code
+                for key in ["first", "first", "second"]]
+
+        assert statuses == [200, 429, 200]
+
+    def test_unknown_api_keys_are_unauthorized(self):
+        with FakeGuardian(api_keys=["valid"]) as guardian:
+            unknown = requests.get(f"{guardian.url}/search",
+                                   params={"q": "test"},
+                                   headers={"api-key": "unknown"})
+            missing = requests.get(f"{guardian.url}/search",
+                                   params={"q": "test"})
+            header = requests.get(f"{guardian.url}/search",
+                                  params={"q": "test"},
+                                  headers={"api-key": "valid"})
+            query = requests.get(f"{guardian.url}/search",
+                                 params={"q": "test", "api-key": "valid"})
+
+        assert unknown.status_code == 401
+        assert missing.status_code == 401
+        assert header.status_code == 200
+        assert query.status_code == 200
+        assert guardian.requests == 4
+
+    def test_unknown_latency_distribution_is_rejected(self):
+        with pytest.raises(ValueError):
+            FakeGuardian(latency_distribution="normal")
@@ -0,0 +1,61 @@
+import pytest
+from pipeline_benchmark import (percentiles,
+                                compare_to_baseline,
+                                format_milliseconds,
+                                MIN_TAIL_SAMPLES)
+
+
+class TestPercentiles:
+    def test_percentiles_of_enough_samples(self):
+        result = percentiles(list(range(1, 21)))
+
+        assert result["p50"] == pytest.approx(10.5)
+        assert result["p95"] == pytest.approx(19.05)
+        assert result["p99"] == pytest.approx(19.81)
+
+    def test_percentiles_ignore_sample_order(self):
+        samples = [0.5, 0.1, 0.3, 0.2, 0.4] * 4
+
+        assert percentiles(samples) == percentiles(sorted(samples))
+
+    def test_tails_need_the_minimum_number_of_samples(self):
+        result = percentiles([1, 2, 3, 4, 100])
+
+        assert result == {"p50": 3, "p95": None, "p99": None}
+
+    def test_tails_are_reported_from_the_minimum(self):
+        below = percentiles([1.0] * (MIN_TAIL_SAMPLES - 1))
+        enough = percentiles([1.0] * MIN_TAIL_SAMPLES)
+
+        assert below["p95"] is None
+        assert enough["p95"] == 1.0
+        assert enough["p99"] == 1.0
+
+    def test_unknown_percentiles_are_formatted_as_a_dash(self):
+        assert format_milliseconds(None).strip() == "-"
+        assert format_milliseconds(0.0123).strip() == "12.3"
+
+
+class TestCompareToBaseline:
+    baseline = {"1": {"searches_per_second": 100.0},
+                "10": {"searches_per_second": 200.0},
+                "guardian": {"requests": 10}}
+
+    def test_throughput_within_tolerance_passes(self):
+        results = {"1": {"searches_per_second": 81.0},
+                   "10": {"searches_per_second": 250.0}}
+
+        assert compare_to_baseline(results, self.baseline, 0.2) == []
+
+    def test_throughput_drop_beyond_tolerance_is_a_regression(self):
+        results = {"1": {"searches_per_second": 79.0},
+                   "10": {"searches_per_second": 200.0}}
+
+        assert compare_to_baseline(results, self.baseline, 0.2) == [
+            "Batch size 1: 79.0 searches/s, baseline 100.0 searches/s."]
+
+    def test_batch_sizes_missing_from_the_baseline_are_skipped(self):
+        results = {"50": {"searches_per_second": 1.0},
+                   "guardian": {"requests": 1}}
+
+        assert compare_to_baseline(results, self.baseline, 0.2) == []
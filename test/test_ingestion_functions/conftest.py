@@ -0,0 +1,10 @@
+import pytest
+from aws_clients import reset_clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_clients():
+    """Cached boto3 clients must not outlive a moto mock."""
+    reset_clients()
+    yield
+    reset_clients()
@@ -1,11 +1,16 @@
 import os
+import json
+import time
+import base64
 import logging
+from unittest import mock
 from datetime import datetime as dt
 import pytest
 import time_machine
 import boto3
+from botocore.exceptions import ClientError
 from moto import mock_aws
-from ingestion_handler import ingestion_handler
+from ingestion_handler import ingestion_handler, put_sharded_records
 
 
 logger = logging.getLogger("TestIngestionLogger")
@@ -19,6 +24,26 @@ def aws_credentials():
     os.environ["AWS_DEFAULT_REGION"] = "eu-west-2"
 
 
+def make_record(data, sequence_number):
+    """Builds a Kinesis event record holding data."""
+    return {
+        'kinesis': {
+            'partitionKey': 'partitionKey-03',
+            'kinesisSchemaVersion': '1.0',
+            'data': base64.b64encode(data.encode('utf-8')).decode('utf-8'),
+            'sequenceNumber': sequence_number,
+            'approximateArrivalTimestamp': 1428537600
+        },
+        'eventSource': 'aws:kinesis',
+        'eventID': f'shardId-000000000000:{sequence_number}',
+        'invokeIdentityArn': 'arn:aws:iam::EXAMPLE',
+        'eventVersion': '1.0',
+        'eventName': 'aws:kinesis:record',
+        'eventSourceARN': 'arn:aws:kinesis:EXAMPLE',
+        'awsRegion': 'eu-west-2'
+    }
+
+
 class TestIngestionHandler:
     @pytest.fixture
     def kinesis_fixture(self):
@@ -81,7 +106,7 @@ class TestIngestionHandler:
                     'kinesis': {
                         'partitionKey': 'partitionKey-03',
                         'kinesisSchemaVersion': '1.0',
-                        'data': 'SGVsbG8sIHRoaXMgaXMgYSB0ZXN0IDEyMy4=',
+                        'data': 'eyJzZWFyY2hfdGVybSI6ICJIZWxsbywgdGhpcyBpcyBhIHRlc3QgMTIzLiJ9',  # noqa E501
                         'sequenceNumber': '49545115243490985018280067714973144582180062593244200961',  # noqa E501
                         'approximateArrivalTimestamp': 1428537600
                     },
@@ -98,7 +123,7 @@ class TestIngestionHandler:
 
         with caplog.at_level(logging.INFO):
             ingestion_handler(event=mock_event, context=None)
-            assert "Success. File 2023-1-1-173019-search-terms.json saved, in bucket: streaming-data-ingested-data-bucket." in caplog.text  # noqa E501
+            assert "Success. File 2023-1-1-173019-shardId-000000000000-49545115243490985018280067714973144582180062593244200961-search-terms.json saved, in bucket: streaming-data-ingested-data-bucket." in caplog.text  # noqa E501
 
     def test_lambda_returns_correct_test_data(
             self,
@@ -130,3 +155,197 @@ class TestIngestionHandler:
         with caplog.at_level(logging.INFO):
             ingestion_handler(event=mock_event, context=None)
             assert "Record Data: Hello, this is a test 123." in caplog.text
+
+
+class TestIngestionHandlerBatches:
+    @pytest.fixture
+    def s3_fixture(self):
+        with mock_aws():
+            s3_client = boto3.client("s3", region_name="eu-west-2")
+            bucket_name = "streaming-data-ingested-data-bucket"
+            s3_client.create_bucket(
+                Bucket=bucket_name,
+                CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+            )
+            yield s3_client, bucket_name
+
+    @pytest.fixture
+    def batch_event(self):
+        return {'Records': [
+            make_record(f'{{"search_term": "search {i}"}}', str(i))
+            for i in range(3)]}
+
+    @time_machine.travel(dt(2023, 1, 1, 17, 30, 19))
+    def test_batch_is_written_as_one_ndjson_file(self,
+                                                 s3_fixture,
+                                                 batch_event):
+        s3_client, bucket_name = s3_fixture
+        ingestion_handler(event=batch_event, context=None)
+
+        contents = s3_client.list_objects(Bucket=bucket_name)["Contents"]
+        assert [c["Key"] for c in contents] == [
+            "2023-1-1-173019-shardId-000000000000-0-search-terms.json"]
+
+        body = s3_client.get_object(
+            Bucket=bucket_name,
+            Key=contents[0]["Key"])["Body"].read()
+        assert body.decode("utf-8").splitlines() == [
+            '{"search_term": "search 0"}',
+            '{"search_term": "search 1"}',
+            '{"search_term": "search 2"}']
+
+    @time_machine.travel(dt(2023, 1, 1, 17, 30, 19))
+    def test_concurrent_batches_do_not_overwrite_each_other(
+            self, s3_fixture):
+        s3_client, bucket_name = s3_fixture
+        first = {'Records': [make_record('{"search_term": "a"}', "1")]}
+        second = {'Records': [make_record('{"search_term": "b"}', "2")]}
+        second['Records'][0]['eventID'] = 'shardId-000000000001:2'
+
+        ingestion_handler(event=first, context=None)
+        ingestion_handler(event=second, context=None)
+
+        contents = s3_client.list_objects(Bucket=bucket_name)["Contents"]
+        bodies = sorted(s3_client.get_object(
+            Bucket=bucket_name, Key=c["Key"])["Body"].read()
+            for c in contents)
+        assert bodies == [b'{"search_term": "a"}\n',
+                          b'{"search_term": "b"}\n']
+
+    @time_machine.travel(dt(2023, 1, 1, 17, 30, 19))
+    def test_sharded_batch_is_written_one_file_per_record(self,
+                                                          s3_fixture,
+                                                          batch_event):
+        s3_client, bucket_name = s3_fixture
+        with mock.patch("ingestion_handler.BATCH_MODE", "sharded"):
+            ingestion_handler(event=batch_event, context=None)
+
+        contents = s3_client.list_objects(Bucket=bucket_name)["Contents"]
+        assert sorted(c["Key"] for c in contents) == [
+            "2023-1-1-173019-0-search-terms.json",
+            "2023-1-1-173019-1-search-terms.json",
+            "2023-1-1-173019-2-search-terms.json"]
+
+    def test_sharded_batch_saves_other_records_on_failure(
+            self, s3_fixture, batch_event, caplog):
+        s3_client, bucket_name = s3_fixture
+        batch_event['Records'][1]['kinesis']['data'] = '!not base64!'
+
+        with mock.patch("ingestion_handler.BATCH_MODE", "sharded"):
+            response = ingestion_handler(event=batch_event, context=None)
+
+        assert response == {"batchItemFailures": []}
+        assert "Record 1 cannot be decoded and was dropped" in caplog.text
+        contents = s3_client.list_objects(Bucket=bucket_name)["Contents"]
+        assert len(contents) == 2
+
+    def test_sharded_batch_reports_failed_uploads(self, batch_event):
+        def put_object(**kwargs):
+            if kwargs["Key"] == "prefix-1-search-terms.json":
+                raise ClientError({"Error": {"Code": "SlowDown",
+                                             "Message": "Slow down"}},
+                                  "PutObject")
+            return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+        client = mock.Mock()
+        client.put_object.side_effect = put_object
+
+        assert put_sharded_records(client, "bucket", "prefix",
+                                   batch_event['Records']) == ["1"]
+
+    def test_sharded_batch_uploads_in_parallel(self, batch_event):
+        def slow_put_object(**kwargs):
+            time.sleep(0.2)
+            return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+        client = mock.Mock()
+        client.put_object.side_effect = slow_put_object
+
+        start = time.perf_counter()
+        failed = put_sharded_records(client, "bucket", "prefix",
+                                     batch_event['Records'], max_workers=3)
+
+        assert failed == []
+        assert time.perf_counter() - start < 0.5
+        assert client.put_object.call_count == 3
+
+    def test_batch_logs_number_of_records(self,
+                                          s3_fixture,
+                                          batch_event,
+                                          caplog):
+        with caplog.at_level(logging.INFO):
+            ingestion_handler(event=batch_event, context=None)
+            assert "Successfully processed 3 records." in caplog.text
+
+
+class TestIngestionHandlerBatchItemFailures:
+    @pytest.fixture
+    def batch_event(self):
+        return {'Records': [
+            make_record(f'{{"search_term": "search {i}"}}', str(i))
+            for i in range(3)]}
+
+    @mock_aws
+    def test_no_failures_are_reported(self, batch_event):
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="streaming-data-ingested-data-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        response = ingestion_handler(event=batch_event, context=None)
+        assert response == {"batchItemFailures": []}
+
+    @mock_aws
+    def test_undecodable_record_is_dropped(self, batch_event, caplog):
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="streaming-data-ingested-data-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        batch_event['Records'][2]['kinesis']['data'] = '!not base64!'
+
+        response = ingestion_handler(event=batch_event, context=None)
+
+        assert response == {"batchItemFailures": []}
+        assert "Record 2 cannot be decoded and was dropped" in caplog.text
+        key = s3_client.list_objects(
+            Bucket="streaming-data-ingested-data-bucket")["Contents"][0]["Key"]
+        body = s3_client.get_object(
+            Bucket="streaming-data-ingested-data-bucket", Key=key)["Body"]
+        assert len(body.read().decode("utf-8").splitlines()) == 2
+
+    @mock_aws
+    def test_records_are_written_one_per_line(self, caplog):
+        s3_client = boto3.client("s3", region_name="eu-west-2")
+        s3_client.create_bucket(
+            Bucket="streaming-data-ingested-data-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        event = {'Records': [
+            make_record('{"search_term": "a"}', "0"),
+            make_record('{\n  "search_term": "b"\n}', "1"),
+            make_record('hello', "2"),
+            make_record('{"search_term": "c"}', "3")]}
+
+        response = ingestion_handler(event=event, context=None)
+
+        assert response == {"batchItemFailures": []}
+        assert "Record 2 cannot be decoded and was dropped" in caplog.text
+        key = s3_client.list_objects(
+            Bucket="streaming-data-ingested-data-bucket")["Contents"][0]["Key"]
+        body = s3_client.get_object(
+            Bucket="streaming-data-ingested-data-bucket", Key=key)["Body"]
+        assert [json.loads(line)["search_term"]
+                for line in body.read().decode("utf-8").splitlines()] == [
+            "a", "b", "c"]
+
+    @mock_aws
+    def test_failed_upload_reports_every_record(self, batch_event, caplog):
+        with caplog.at_level(logging.ERROR):
+            response = ingestion_handler(event=batch_event, context=None)
+
+        assert response == {"batchItemFailures": [
+            {"itemIdentifier": "0"},
+            {"itemIdentifier": "1"},
+            {"itemIdentifier": "2"}]}
+        assert "Failed to process 3 records." in caplog.text
@@ -0,0 +1,115 @@
+import io
+import json
+import pytest
+import boto3
+from moto import mock_aws
+from input_tool.bulk_input_tool import bulk_input_tool, validate_search
+
+
+class TestBulkInputTool:
+    @pytest.fixture
+    def kinesis_fixture(self):
+        with mock_aws():
+            kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+            data_stream_name = "streaming_data_project_input"
+            kinesis_client.create_stream(
+                StreamName=data_stream_name,
+                ShardCount=1)
+            yield kinesis_client, data_stream_name
+
+    def read_stream(self, kinesis_client, data_stream_name):
+        shard_iterator = kinesis_client.get_shard_iterator(
+            StreamName=data_stream_name,
+            ShardId="shardId-000000000000",
+            ShardIteratorType="TRIM_HORIZON")["ShardIterator"]
+        response = kinesis_client.get_records(ShardIterator=shard_iterator,
+                                              Limit=10000)
+        return [json.loads(record["Data"]) for record in response["Records"]]
+
+    def test_jsonl_searches_are_submitted(self, kinesis_fixture):
+        kinesis_client, data_stream_name = kinesis_fixture
+        source = io.StringIO("".join(
+            json.dumps({"search_term": f"search {i}",
+                        "date_from": "2023-01-01",
+                        "reference": "guardian_content"}) + "\n"
+            for i in range(1200)))
+
+        result = bulk_input_tool(source, "jsonl")
+
+        assert result["submitted"] == 1200
+        assert result["skipped"] == 0
+        records = self.read_stream(kinesis_client, data_stream_name)
+        assert len(records) == 1200
+        assert records[5] == {"search_term": "search 5",
+                              "date_from": "2023-01-01",
+                              "reference": "guardian_content"}
+
+    def test_csv_searches_are_submitted(self, kinesis_fixture):
+        kinesis_client, data_stream_name = kinesis_fixture
+        source = io.StringIO(
+            "search_term,date_from,reference\n"
+            "machine learning,2023-01-01,guardian_content\n"
+            "  computers  ,,\n")
+
+        bulk_input_tool(source, "csv")
+
+        assert self.read_stream(kinesis_client, data_stream_name) == [
+            {"search_term": "machine learning",
+             "date_from": "2023-01-01",
+             "reference": "guardian_content"},
+            {"search_term": "computers",
+             "date_from": "2021-01-01",
+             "reference": "guardian_content"}]
+
+    def test_invalid_searches_are_skipped(self, kinesis_fixture, capsys):
+        kinesis_client, data_stream_name = kinesis_fixture
+        source = io.StringIO(
+            '{"search_term": "good", "date_from": "2023-01-01"}\n'
+            '{"search_term": "bad date", "date_from": "19-1-1"}\n'
+            'not json\n'
+            '[1, 2]\n'
+            '{"search_term": "number date", "date_from": 20210101}\n'
+            '{"search_term": "also good"}\n')
+
+        result = bulk_input_tool(source, "jsonl")
+
+        assert result["submitted"] == 2
+        assert result["skipped"] == 4
+        output = capsys.readouterr().out
+        assert "Skipping search 2" in output
+        assert "Skipping search 4: A search must be a JSON object." in output
+        assert "Skipping search 5: date_from must be a string." in output
+        assert "Skipped 4 invalid searches." in output
+        assert len(self.read_stream(kinesis_client, data_stream_name)) == 2
+
+    def test_progress_and_throughput_are_reported(self,
+                                                  kinesis_fixture,
+                                                  capsys):
+        source = io.StringIO('{"search_term": "search"}\n' * 5)
+
+        bulk_input_tool(source, "jsonl", progress_every=2)
+
+        output = capsys.readouterr().out.splitlines()
+        assert output[0].startswith("Submitted 2 searches (")
+        assert output[1].startswith("Submitted 4 searches (")
+        assert output[2].startswith("Submitted 5 searches in ")
+        assert output[2].endswith("using 1 Kinesis requests.")
+
+
+class TestValidateSearch:
+    def test_defaults_are_used(self):
+        assert validate_search({}) == {"search_term": "machine learning",
+                                       "date_from": "2021-01-01",
+                                       "reference": "guardian_content"}
+
+    def test_invalid_date_raises(self):
+        with pytest.raises(ValueError):
+            validate_search({"date_from": "2023-13-01"})
+
+    def test_non_object_raises(self):
+        with pytest.raises(ValueError):
+            validate_search("[1, 2]")
+
+    def test_non_string_field_raises(self):
+        with pytest.raises(ValueError):
+            validate_search({"search_term": ["a", "b"]})
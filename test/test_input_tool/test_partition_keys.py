@@ -0,0 +1,116 @@
+import json
+import pytest
+import boto3
+from moto import mock_aws
+from input_tool.partition_keys import (get_partition_key_strategy,
+                                       simulate_shard_distribution,
+                                       format_shard_distribution,
+                                       FixedPartitionKey,
+                                       HashPartitionKey,
+                                       RoundRobinPartitionKey,
+                                       ExplicitHashKeyBalancer,
+                                       main)
+from input_tool.put_record_util import put_record, KinesisProducer
+
+
+def searches(count):
+    return [json.dumps({"search_term": f"search {i}",
+                        "date_from": "2023-01-01",
+                        "reference": "guardian_content"}).encode("utf-8")
+            for i in range(count)]
+
+
+class TestPartitionKeyStrategies:
+    def test_fixed_strategy_uses_one_shard(self):
+        counts = simulate_shard_distribution(
+            FixedPartitionKey(), searches(100), 4)
+        assert sorted(counts) == [0, 0, 0, 100]
+
+    def test_hash_strategy_is_stable(self):
+        strategy = HashPartitionKey()
+        assert strategy(b"search") == strategy(b"search")
+        assert strategy(b"search") != strategy(b"other search")
+
+    def test_hash_strategy_uses_field(self):
+        strategy = HashPartitionKey(field="reference")
+        records = searches(2)
+        assert strategy(records[0]) == strategy(records[1])
+
+    @pytest.mark.parametrize("name", ["hash", "random"])
+    def test_strategies_spread_searches(self, name):
+        counts = simulate_shard_distribution(
+            get_partition_key_strategy(name), searches(1000), 4)
+        assert all(count > 100 for count in counts)
+
+    def test_round_robin_strategy_cycles_keys(self):
+        strategy = RoundRobinPartitionKey(key_count=3)
+        keys = [strategy(data)["PartitionKey"] for data in searches(6)]
+        assert keys == ["0", "1", "2", "0", "1", "2"]
+
+    def test_balanced_strategy_is_exact(self):
+        counts = simulate_shard_distribution(
+            ExplicitHashKeyBalancer(shard_count=3), searches(300), 3)
+        assert counts == [100, 100, 100]
+
+    def test_unknown_strategy_raises(self):
+        with pytest.raises(ValueError):
+            get_partition_key_strategy("unknown")
+
+    def test_default_strategy_is_read_from_environment(self, monkeypatch):
+        monkeypatch.setenv("PARTITION_KEY_STRATEGY", "fixed")
+        assert isinstance(get_partition_key_strategy(), FixedPartitionKey)
+
+    def test_format_shard_distribution(self):
+        report = format_shard_distribution([30, 10])
+        assert report.splitlines() == [
+            "shardId-000000000000: 30 records (75.0%)",
+            "shardId-000000000001: 10 records (25.0%)",
+            "Hottest shard: 1.50x the mean of 20.0 records."]
+
+    def test_simulation_cli(self, tmp_path, capsys):
+        sample = tmp_path / "sample.jsonl"
+        sample.write_bytes(b"\n".join(searches(8)))
+
+        main(["--strategy", "balanced", "--shards", "2",
+              "--file", str(sample)])
+
+        output = capsys.readouterr().out
+        assert "shardId-000000000001: 4 records (50.0%)" in output
+
+
+class TestPutRecordsWithStrategy:
+    @pytest.fixture
+    def kinesis_fixture(self):
+        with mock_aws():
+            kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+            data_stream_name = "streaming_data_project_input"
+            kinesis_client.create_stream(
+                StreamName=data_stream_name,
+                ShardCount=2)
+            yield kinesis_client, data_stream_name
+
+    def records_per_shard(self, kinesis_client, data_stream_name):
+        counts = []
+        for shard in ["shardId-000000000000", "shardId-000000000001"]:
+            shard_iterator = kinesis_client.get_shard_iterator(
+                StreamName=data_stream_name,
+                ShardId=shard,
+                ShardIteratorType="TRIM_HORIZON")["ShardIterator"]
+            counts.append(len(kinesis_client.get_records(
+                ShardIterator=shard_iterator)["Records"]))
+        return counts
+
+    def test_put_record_uses_strategy(self, kinesis_fixture):
+        strategy = ExplicitHashKeyBalancer(shard_count=2)
+        for data in searches(4):
+            put_record(data, partition_key_strategy=strategy)
+
+        assert self.records_per_shard(*kinesis_fixture) == [2, 2]
+
+    def test_producer_uses_strategy(self, kinesis_fixture):
+        strategy = ExplicitHashKeyBalancer(shard_count=2)
+        with KinesisProducer(partition_key_strategy=strategy) as producer:
+            for data in searches(6):
+                producer.put(data)
+
+        assert self.records_per_shard(*kinesis_fixture) == [3, 3]
@@ -1,11 +1,14 @@
 import os
 import logging
 import json
+from unittest import mock
 import pytest
 import boto3
 from moto import mock_aws
 from botocore.exceptions import ClientError
-from input_tool.put_record_util import put_record
+from input_tool.put_record_util import (put_record,
+                                        KinesisProducer,
+                                        KinesisPutRecordsError)
 
 logger = logging.getLogger("TestUserInputTool")
 logger.setLevel(logging.INFO)
@@ -72,3 +75,103 @@ class TestPutRecordUtil:
         except ClientError as ce:
             assert ce.response["Error"]["Code"] == "ResourceNotFoundException"
             assert (ce.response["Error"]["Message"] == "Stream streaming_data_project_input under account 123456789012 not found.") # noqa E501
+
+
+class TestKinesisProducer:
+    @pytest.fixture
+    def kinesis_fixture(self):
+        with mock_aws():
+            kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+            data_stream_name = "streaming_data_project_input"
+            kinesis_client.create_stream(
+                StreamName=data_stream_name,
+                ShardCount=1)
+            yield kinesis_client, data_stream_name
+
+    @pytest.fixture
+    def bad_kinesis_fixture(self):
+        with mock_aws():
+            kinesis_client = boto3.client("kinesis", region_name="eu-west-2")
+            kinesis_client.create_stream(
+                StreamName="bad_stream_name",
+                ShardCount=1)
+            yield kinesis_client
+
+    def read_stream(self, kinesis_client, data_stream_name):
+        shard_iterator = kinesis_client.get_shard_iterator(
+            StreamName=data_stream_name,
+            ShardId="shardId-000000000000",
+            ShardIteratorType="TRIM_HORIZON")["ShardIterator"]
+        response = kinesis_client.get_records(ShardIterator=shard_iterator,
+                                              Limit=10000)
+        return [record["Data"] for record in response["Records"]]
+
+    def test_records_are_sent_in_batches(self, kinesis_fixture):
+        kinesis_client, data_stream_name = kinesis_fixture
+        records = [f"record {i}".encode("utf-8") for i in range(1200)]
+
+        with KinesisProducer(flush_interval=60) as producer:
+            for data in records:
+                producer.put(data)
+
+        assert producer.api_calls == 3
+        assert producer.records_sent == 1200
+        assert self.read_stream(kinesis_client, data_stream_name) == records
+
+    def test_batches_are_limited_by_size(self, kinesis_fixture):
+        with KinesisProducer(max_bytes=1000, flush_interval=60) as producer:
+            for _ in range(10):
+                producer.put(b"x" * 299)
+
+        assert producer.api_calls == 4
+        assert producer.records_sent == 10
+
+    def test_records_are_sent_after_flush_interval(self, kinesis_fixture):
+        producer = KinesisProducer(flush_interval=0)
+        producer.put(b"record")
+        assert producer.records_sent == 1
+
+    def test_put_fails_with_bad_data_type(self, kinesis_fixture):
+        with pytest.raises(TypeError):
+            KinesisProducer().put("bad data type - string")
+
+    def test_put_fails_with_oversized_record(self, kinesis_fixture):
+        with pytest.raises(ValueError):
+            KinesisProducer().put(b"x" * 1024 * 1024)
+
+    def test_only_rejected_records_are_retried(self):
+        client = mock.Mock()
+        client.put_records.side_effect = [
+            {"Records": [{"SequenceNumber": "1"},
+                         {"ErrorCode": "ProvisionedThroughputExceededException"}, # noqa E501
+                         {"SequenceNumber": "2"}]},
+            {"Records": [{"SequenceNumber": "3"}]}]
+
+        with mock.patch("time.sleep") as sleep:
+            with KinesisProducer(client=client, flush_interval=60) as producer: # noqa E501
+                for data in [b"a", b"b", b"c"]:
+                    producer.put(data)
+
+        retried = client.put_records.call_args_list[1].kwargs["Records"]
+        assert [record["Data"] for record in retried] == [b"b"]
+        assert producer.records_sent == 3
+        sleep.assert_called_once_with(0.1)
+
+    def test_rejected_records_raise_after_retries(self):
+        client = mock.Mock()
+        client.put_records.return_value = {
+            "Records": [{"ErrorCode": "InternalFailure"}]}
+
+        producer = KinesisProducer(client=client,
+                                   flush_interval=60,
+                                   max_retries=2)
+        producer.put(b"a")
+        with mock.patch("time.sleep"):
+            with pytest.raises(KinesisPutRecordsError):
+                producer.flush()
+        assert client.put_records.call_count == 3
+
+    def test_producer_with_no_stream(self, bad_kinesis_fixture):
+        with pytest.raises(ClientError):
+            with KinesisProducer() as producer:
+                producer.put(b"record")
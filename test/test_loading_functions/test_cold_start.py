@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+HANDLER = "loading_handler"
+# Modules only needed once the handler runs (or only by some
+# invocations), which must not be imported with the handler module.
+DEFERRED = ["boto3", "cProfile", "tracemalloc", "pstats"]
+# The cumulative import time of the handler module, in milliseconds.
+BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "100"))
+
+
+def import_handler():
+    """
+    Imports the handler module in a fresh interpreter,
+    as a cold start does, with python -X importtime.
+
+    Returns
+    -------
+    tuple
+        The cumulative import time of the handler module in milliseconds,
+        and the names of the modules imported with it.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {HANDLER}"],
+        capture_output=True, text=True, check=True, env=os.environ.copy())
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Modules are listed after the modules they import,
+        # indented by two spaces per level.
+        if name.strip() == HANDLER:
+            return int(cumulative) / 1000, modules
+        if not name.startswith("   "):
+            # Imported at startup, before the handler.
+            modules = []
+            continue
+        modules.append(name.strip())
+    raise AssertionError(f"{HANDLER} was not imported:\n{result.stderr}")
+
+
+class TestColdStart:
+    def test_handler_import_defers_heavy_modules(self):
+        _, modules = import_handler()
+        imported = {module.split(".")[0] for module in modules}
+
+        assert imported.isdisjoint(DEFERRED), imported & set(DEFERRED)
+
+    def test_handler_import_is_within_budget(self):
+        # The best of three runs, so a busy machine does not fail the test.
+        duration = min(import_handler()[0] for _ in range(3))
+
+        assert duration < BUDGET_MS
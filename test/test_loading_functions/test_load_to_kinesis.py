@@ -0,0 +1,100 @@
+import json
+from unittest import mock
+import pytest
+from load_to_kinesis import (split_content,
+                             put_records_in_batches,
+                             KinesisPutRecordsError)
+from partition_keys import FixedPartitionKey
+
+
+def transformed_content(number_of_articles, preview="preview"):
+    return json.dumps({"content": {
+        str(i): {"webTitle": f"Article {i}", "content_preview": preview}
+        for i in range(1, number_of_articles + 1)}}).encode("utf-8")
+
+
+class TestSplitContent:
+    def test_one_record_per_article(self):
+        records = [json.loads(record) for record in
+                   split_content(transformed_content(3), "id", "article")]
+
+        assert [(r["correlation_id"], r["part"], r["total"])
+                for r in records] == [("id", 1, 3), ("id", 2, 3), ("id", 3, 3)]
+        assert records[1]["content"] == {
+            "2": {"webTitle": "Article 2", "content_preview": "preview"}}
+
+    def test_parts_reassemble_into_content(self):
+        content = transformed_content(10)
+        reassembled = {}
+        for record in split_content(content, "id", "article"):
+            reassembled.update(json.loads(record)["content"])
+        assert {"content": reassembled} == json.loads(content)
+
+    def test_chunks_are_bounded_by_size(self):
+        records = split_content(transformed_content(10, "x" * 400),
+                                "id", "chunk", max_bytes=1500)
+
+        assert len(records) == 4
+        assert all(len(record) <= 1500 for record in records)
+        assert sum(len(json.loads(record)["content"])
+                   for record in records) == 10
+
+    def test_oversized_article_raises(self):
+        with pytest.raises(ValueError):
+            split_content(transformed_content(1, "x" * 2000),
+                          "id", "article", max_bytes=1000)
+
+    def test_other_documents_are_unchanged(self):
+        content = b'{"search_term": "machine learning"}'
+        assert split_content(content, "id") == [content]
+
+
+class TestPutRecordsInBatches:
+    def test_records_are_sent_in_batches(self):
+        client = mock.Mock()
+        client.put_records.side_effect = lambda StreamName, Records: {
+            "Records": [{"SequenceNumber": "1"}] * len(Records)}
+
+        api_calls = put_records_in_batches(
+            client, "stream", [b"record"] * 1200, FixedPartitionKey())
+
+        assert api_calls == 3
+        assert [len(call.kwargs["Records"])
+                for call in client.put_records.call_args_list] == [
+                    500, 500, 200]
+
+    def test_batches_are_limited_by_size(self):
+        client = mock.Mock()
+        client.put_records.side_effect = lambda StreamName, Records: {
+            "Records": [{"SequenceNumber": "1"}] * len(Records)}
+
+        api_calls = put_records_in_batches(
+            client, "stream", [b"x" * (1024 * 1024 - 1)] * 6,
+            FixedPartitionKey())
+
+        assert api_calls == 2
+
+    def test_only_rejected_records_are_retried(self):
+        client = mock.Mock()
+        client.put_records.side_effect = [
+            {"Records": [{"ErrorCode": "InternalFailure"},
+                         {"SequenceNumber": "1"}]},
+            {"Records": [{"SequenceNumber": "2"}]}]
+
+        with mock.patch("time.sleep"):
+            put_records_in_batches(client, "stream", [b"a", b"b"],
+                                   FixedPartitionKey())
+
+        retried = client.put_records.call_args_list[1].kwargs["Records"]
+        assert retried == [{"Data": b"a", "PartitionKey": "0"}]
+
+    def test_rejected_records_raise_after_retries(self):
+        client = mock.Mock()
+        client.put_records.return_value = {
+            "Records": [{"ErrorCode": "InternalFailure"}]}
+
+        with mock.patch("time.sleep"):
+            with pytest.raises(KinesisPutRecordsError):
+                put_records_in_batches(client, "stream", [b"a"],
+                                       FixedPartitionKey(), max_retries=2)
+        assert client.put_records.call_count == 3
@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 import pytest
 from moto import mock_aws
@@ -129,3 +130,62 @@ class TestLoadingHandler:
         with caplog.at_level(logging.ERROR):
             assert "Error: ResourceNotFoundException" in caplog.text
             assert "Error: Stream streaming_data_project_output under account 123456789012 not found." in caplog.text # noqa E501
+
+    @mock_aws
+    def test_loading_lambda_splits_content_into_articles(self,
+                                                         s3_fixture,
+                                                         kinesis_fixture):
+        s3, s3_transformed = s3_fixture
+        kinesis_client, data_stream_name = kinesis_fixture
+        content = {"content": {
+            str(i): {"webTitle": f"Article {i}"} for i in range(1, 4)}}
+        s3.put_object(Bucket=s3_transformed,
+                      Key="2024-6-10-103825-transformed-content.json",
+                      Body=json.dumps(content).encode("utf-8"))
+
+        loading_handler(test_event, "content")
+
+        shard_iterator = kinesis_client.get_shard_iterator(
+            StreamName=data_stream_name,
+            ShardId="shardId-000000000000",
+            ShardIteratorType="TRIM_HORIZON")
+        response = kinesis_client.get_records(
+            ShardIterator=shard_iterator["ShardIterator"])
+        records = [json.loads(record["Data"])
+                   for record in response["Records"]]
+
+        assert len(records) == 3
+        assert {record["part"] for record in records} == {1, 2, 3}
+        assert records[0]["total"] == 3
+        assert records[0]["correlation_id"] == "streaming-data-transformed-data-bucket/2024-6-10-103825-transformed-content.json" # noqa E501
+
+    @mock_aws
+    def test_loading_lambda_loads_every_object(self,
+                                               s3_fixture,
+                                               kinesis_fixture):
+        s3, s3_transformed = s3_fixture
+        kinesis_client, data_stream_name = kinesis_fixture
+        for key in ["first.json", "second.json"]:
+            content = {"content": {"1": {"webTitle": key}}}
+            s3.put_object(Bucket=s3_transformed,
+                          Key=key,
+                          Body=json.dumps(content).encode("utf-8"))
+
+        event = {"Records": [
+            {"s3": {"bucket": {"name": s3_transformed},
+                    "object": {"key": key}}}
+            for key in ["first.json", "second.json"]]}
+        results = loading_handler(event, "content")
+
+        assert [(r["key"], r["records"], r["error"]) for r in results] == [
+            ("first.json", 1, None), ("second.json", 1, None)]
+
+        shard_iterator = kinesis_client.get_shard_iterator(
+            StreamName=data_stream_name,
+            ShardId="shardId-000000000000",
+            ShardIteratorType="TRIM_HORIZON")
+        response = kinesis_client.get_records(
+            ShardIterator=shard_iterator["ShardIterator"])
+        titles = sorted(json.loads(record["Data"])["content"]["1"]["webTitle"]
+                        for record in response["Records"])
+        assert titles == ["first.json", "second.json"]
@@ -1,3 +1,5 @@
+import gzip
+import json
 import os
 import logging
 from moto import mock_aws
@@ -88,3 +90,31 @@ class TestReadTransformedS3Json:
 
             read_transformed_s3_json(event)
             assert "No such bucket - test_bucket" in caplog.text
+
+    @mock_aws
+    def test_read_s3_json_compressed_ndjson(self):
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="test_bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        s3.put_object(
+            Bucket="test_bucket",
+            Key="test.ndjson.gz",
+            Body=gzip.compress(b'{"1": {"a": 1}}\n{"2": {"b": 2}}\n'),
+            ContentEncoding="gzip")
+
+        event = {
+            "Records": [
+                {
+                    "s3": {
+                        "bucket": {"name": "test_bucket"},
+                        "object": {"key": "test.ndjson.gz"},
+                    }
+                }
+            ]
+        }
+
+        result = read_transformed_s3_json(event)
+        assert json.loads(result) == {"content": {"1": {"a": 1},
+                                                  "2": {"b": 2}}}
@@ -0,0 +1,22 @@
+import pytest
+from aws_clients import reset_clients
+from get_api_utils import clear_secret_cache
+from search_cache import clear_search_cache
+from preview_cache import clear_preview_cache
+from metrics import clear_metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_clients():
+    """Cached clients, secrets, searches and previews must not leak."""
+    reset_clients()
+    clear_secret_cache()
+    clear_search_cache()
+    clear_preview_cache()
+    clear_metrics()
+    yield
+    reset_clients()
+    clear_secret_cache()
+    clear_search_cache()
+    clear_preview_cache()
+    clear_metrics()
@@ -0,0 +1,64 @@
+import asyncio
+from unittest import mock
+from async_transform import transform_records_async
+
+record = {"s3": {"bucket": {"name": "bucket"},
+                 "object": {"key": "searches.json"}}}
+
+
+class TestTransformRecordsAsync:
+    def test_searches_are_transformed_while_the_object_is_read(self):
+        events = []
+
+        def read_s3_ndjson(event):
+            for i in range(1, 6):
+                events.append(f"read {i}")
+                yield {"search_term": str(i)}
+
+        def transform_search(search_terms):
+            events.append(f"search {search_terms['search_term']}")
+            return {"content": {}}
+
+        with mock.patch("async_transform.read_s3_ndjson", read_s3_ndjson), \
+                mock.patch("async_transform.get_api_key"), \
+                mock.patch("async_transform.write_file_to_s3") as write:
+            results = asyncio.run(transform_records_async(
+                [record], transform_search, max_concurrency=1))
+
+        assert results == [{"bucket": "bucket", "key": "searches.json",
+                            "result": 5}]
+        # With one search in flight, reading waits for the first search
+        # before reading beyond the lookahead.
+        assert events.index("search 1") < events.index("read 4")
+        assert [call.args[1] for call in write.call_args_list] == [
+            1, 2, 3, 4, 5]
+
+    def test_single_search_keeps_the_file_name_without_part(self):
+        def read_s3_ndjson(event):
+            yield {"search_term": "only"}
+
+        with mock.patch("async_transform.read_s3_ndjson", read_s3_ndjson), \
+                mock.patch("async_transform.get_api_key"), \
+                mock.patch("async_transform.write_file_to_s3") as write:
+            asyncio.run(transform_records_async(
+                [record], lambda search_terms: {"content": {}}))
+
+        write.assert_called_once_with({"content": {}}, None,
+                                      source_key="searches.json")
+
+    def test_failed_search_is_reported_for_its_object(self):
+        def read_s3_ndjson(event):
+            yield {"search_term": "first"}
+            yield {"search_term": "second"}
+
+        def transform_search(search_terms):
+            raise ValueError(search_terms["search_term"])
+
+        with mock.patch("async_transform.read_s3_ndjson", read_s3_ndjson), \
+                mock.patch("async_transform.get_api_key"), \
+                mock.patch("async_transform.write_file_to_s3"):
+            results = asyncio.run(transform_records_async(
+                [record], transform_search))
+
+        assert "result" not in results[0]
+        assert isinstance(results[0]["error"], ValueError)
@@ -0,0 +1,30 @@
+import boto3
+from moto import mock_aws
+from aws_clients import get_client, reset_clients
+
+
+@mock_aws
+class TestGetClient:
+    def test_client_is_reused(self):
+        assert get_client("s3") is get_client("s3")
+
+    def test_clients_are_keyed_by_service_and_region(self):
+        s3 = get_client("s3", region_name="eu-west-2")
+
+        assert get_client("s3", region_name="us-east-1") is not s3
+        assert get_client("kinesis", region_name="eu-west-2") is not s3
+        assert get_client("s3", region_name="eu-west-2") is s3
+
+    def test_reset_clients_creates_new_client(self):
+        s3 = get_client("s3")
+        reset_clients()
+        assert get_client("s3") is not s3
+
+    def test_cached_client_works_with_moto(self):
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        s3.create_bucket(
+            Bucket="test_bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+        buckets = get_client("s3", region_name="eu-west-2").list_buckets()
+        assert buckets["Buckets"][0]["Name"] == "test_bucket"
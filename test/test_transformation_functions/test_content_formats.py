@@ -0,0 +1,52 @@
+import gzip
+import json
+import pytest
+from content_formats import (encode_content,
+                             decode_content,
+                             get_suffix,
+                             is_content_key)
+
+content = {"content": {"1": {"webTitle": "Café", "content_preview": "a"},
+                       "2": {"webTitle": "Two", "content_preview": "b"}}}
+
+
+class TestContentFormats:
+    def test_json_is_compact(self):
+        data, content_encoding = encode_content(content, "json")
+        assert content_encoding is None
+        assert b"\n" not in data and b": " not in data
+        assert json.loads(data) == content
+
+    def test_ndjson_writes_one_article_per_line(self):
+        data, _ = encode_content(content, "ndjson")
+        assert data.decode("utf-8").splitlines() == [
+            '{"1":{"webTitle":"Café","content_preview":"a"}}',
+            '{"2":{"webTitle":"Two","content_preview":"b"}}']
+
+    def test_ndjson_gzip_is_compressed(self):
+        data, content_encoding = encode_content(content, "ndjson-gzip")
+        assert content_encoding == "gzip"
+        assert gzip.decompress(data) == encode_content(content, "ndjson")[0]
+
+    @pytest.mark.parametrize("output_format",
+                             ["json", "ndjson", "ndjson-gzip"])
+    def test_round_trip(self, output_format):
+        data, _ = encode_content(content, output_format)
+        key = "file" + get_suffix(output_format)
+        assert is_content_key(key)
+        assert json.loads(decode_content(data, key)) == content
+
+    def test_round_trip_zstd(self):
+        pytest.importorskip("zstandard")
+        data, _ = encode_content(content, "ndjson-zstd")
+        assert json.loads(decode_content(data, "file.ndjson.zst")) == content
+
+    def test_format_is_detected_from_content_encoding(self):
+        data, content_encoding = encode_content(content, "ndjson-gzip")
+        assert json.loads(decode_content(
+            data, "file.ndjson", content_encoding)) == content
+
+    def test_unknown_format_raises_value_error(self):
+        with pytest.raises(ValueError):
+            encode_content(content, "parquet")
+        assert not is_content_key("file.txt")
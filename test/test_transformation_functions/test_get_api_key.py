@@ -1,10 +1,11 @@
 import os
 import logging
 import json
+from unittest import mock
 import pytest
 import boto3
 from moto import mock_aws
-from get_api_utils import get_api_key
+from get_api_utils import get_api_key, refresh_api_key_in_background
 
 logger = logging.getLogger()
 
@@ -49,3 +50,58 @@ class TestGetApiKey:
             SecretString=json.dumps(secret_string))
 
         assert get_api_key("Mock") == "mock real key"
+
+
+class TestGetApiKeyCache:
+    @pytest.fixture
+    def secrets_client(self):
+        with mock_aws():
+            client = boto3.client("secretsmanager", region_name="eu-west-2")
+            client.create_secret(
+                Name="Mock",
+                SecretString=json.dumps({"api_key": "first key"}))
+            yield client
+
+    def rotate(self, client):
+        client.put_secret_value(
+            SecretId="Mock",
+            SecretString=json.dumps({"api_key": "second key"}))
+
+    def test_cached_key_is_returned_within_ttl(self, secrets_client):
+        assert get_api_key("Mock", ttl=300) == "first key"
+        self.rotate(secrets_client)
+        assert get_api_key("Mock", ttl=300) == "first key"
+
+    def test_expired_key_is_fetched_again(self, secrets_client):
+        assert get_api_key("Mock", ttl=0) == "first key"
+        self.rotate(secrets_client)
+        assert get_api_key("Mock", ttl=0) == "second key"
+
+    def test_force_refresh_fetches_key(self, secrets_client):
+        assert get_api_key("Mock") == "first key"
+        self.rotate(secrets_client)
+        assert get_api_key("Mock", force_refresh=True) == "second key"
+        assert get_api_key("Mock") == "second key"
+
+    def test_stale_key_is_returned_while_revalidating(self, secrets_client):
+        assert get_api_key("Mock") == "first key"
+        self.rotate(secrets_client)
+
+        with mock.patch("get_api_utils.refresh_api_key_in_background") as refresh: # noqa E501
+            assert get_api_key(
+                "Mock", ttl=0, stale_while_revalidate=True) == "first key"
+            refresh.assert_called_once_with("Mock")
+
+    def test_background_refresh_updates_cache(self, secrets_client):
+        assert get_api_key("Mock") == "first key"
+        self.rotate(secrets_client)
+
+        refresh_api_key_in_background("Mock").join()
+        assert get_api_key("Mock") == "second key"
+
+    def test_errors_are_not_cached(self, secrets_client):
+        assert get_api_key("Missing") is None
+        secrets_client.create_secret(
+            Name="Missing",
+            SecretString=json.dumps({"api_key": "new key"}))
+        assert get_api_key("Missing") == "new key"
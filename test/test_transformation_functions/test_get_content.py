@@ -1,9 +1,50 @@
-from get_content import get_content, get_content_preview
+import time
+import pytest
+import requests
+import responses
+from get_content import (get_content,
+                         get_content_preview,
+                         GuardianThrottledError)
+from guardian_session import create_session
+
+search_link = "https://content.guardianapis.com/search?q=test&from-date=2023-01-01" # noqa 501
+
+
+def mock_guardian_search(number_of_results, delay=0, show_fields=()):
+    """Registers a search with number_of_results articles.
+    Articles whose index is in show_fields include their body."""
+    results = [
+        {
+            "id": f"article-{i}",
+            "webPublicationDate": "2023-11-21T11:11:31Z",
+            "webTitle": f"Article {i}",
+            "webUrl": f"https://www.theguardian.com/article-{i}",
+            "apiUrl": f"https://content.guardianapis.com/article-{i}",
+        }
+        for i in range(number_of_results)
+    ]
+    for i in show_fields:
+        results[i]["fields"] = {"body": f"Body of article {i}"}
+    responses.add(
+        responses.GET,
+        "https://content.guardianapis.com/search",
+        json={"response": {"results": results}})
+
+    for i in range(number_of_results):
+        def callback(request, body=f"Body of article {i}"):
+            time.sleep(delay)
+            return (200, {},
+                    f'{{"response": {{"content": {{"fields": {{"body": "{body}"}}}}}}}}') # noqa 501
+
+        responses.add_callback(
+            responses.GET,
+            f"https://content.guardianapis.com/article-{i}",
+            callback=callback)
 
 
 class TestGetContent:
     def test_get_content(self):
-        api_link = "https://content.guardianapis.com/search?q=machine%20learning&from-date=2023-01-01&api-key=test" # noqa 501
+        api_link = "https://content.guardianapis.com/search?q=machine%20learning&from-date=2023-01-01" # noqa 501
         api_key = "test"
         input = get_content(api_link, api_key)
 
@@ -13,7 +54,7 @@ class TestGetContent:
         assert check_extract == result
 
     def test_get_content_returns_correct_number_of_results(self):
-        api_link = "https://content.guardianapis.com/search?q=machine%20learning&from-date=2023-01-01&api-key=test" # noqa 501
+        api_link = "https://content.guardianapis.com/search?q=machine%20learning&from-date=2023-01-01" # noqa 501
         api_key = "test"
         input = get_content(api_link, api_key)
         check_extract = input['content']
@@ -22,8 +63,216 @@ class TestGetContent:
 
 class TestGetContentPreview:
     def test_get_content_preview(self):
-        testUrl = "https://content.guardianapis.com/info/2023/nov/21/who-said-what-using-machine-learning-to-correctly-attribute-quotes?show-elements=all&show-fields=body&api-key=test" # noqa 501
+        testUrl = "https://content.guardianapis.com/info/2023/nov/21/who-said-what-using-machine-learning-to-correctly-attribute-quotes?show-elements=all&show-fields=body" # noqa 501
 
-        input = get_content_preview(testUrl)[:50]
+        input = get_content_preview(testUrl, api_key="test")[:50]
         result = "<h2><strong>Michel, Anna, Alice – The Guardian</st"
         assert input == result
+
+
+class TestGetContentConcurrently:
+    @responses.activate
+    def test_get_content_keeps_result_order(self):
+        mock_guardian_search(10)
+        content = get_content(search_link, "test", max_workers=4)["content"]
+
+        assert list(content) == list(range(1, 11))
+        for i in range(10):
+            assert content[i+1]["webTitle"] == f"Article {i}"
+            assert content[i+1]["content_preview"] == f"Body of article {i}"
+
+    @responses.activate
+    def test_get_content_fetches_previews_in_parallel(self):
+        mock_guardian_search(5, delay=0.2)
+        start = time.perf_counter()
+        get_content(search_link, "test", max_workers=5)
+        assert time.perf_counter() - start < 0.6
+
+    @responses.activate
+    def test_get_content_sequential_matches_concurrent(self):
+        mock_guardian_search(3)
+        sequential = get_content(search_link, "test", max_workers=1)
+        concurrent = get_content(search_link, "test", max_workers=3)
+        assert sequential == concurrent
+
+
+class TestGetContentWithShowFields:
+    @responses.activate
+    def test_get_content_uses_search_fields(self):
+        mock_guardian_search(10, show_fields=range(10))
+        content = get_content(search_link, "test")["content"]
+
+        assert len(responses.calls) == 1
+        assert content[3]["content_preview"] == "Body of article 2"
+
+    @responses.activate
+    def test_get_content_fetches_missing_fields_only(self):
+        mock_guardian_search(4, show_fields=[0, 2])
+        content = get_content(search_link, "test")["content"]
+
+        assert len(responses.calls) == 3
+        assert [call.request.url.split("?")[0] for call in responses.calls[1:]] == [ # noqa 501
+            "https://content.guardianapis.com/article-1",
+            "https://content.guardianapis.com/article-3"]
+        assert [content[i]["content_preview"] for i in content] == [
+            f"Body of article {i}" for i in range(4)]
+
+    @responses.activate
+    def test_get_content_truncates_search_fields(self):
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/search",
+            json={"response": {"results": [{
+                "webPublicationDate": "2023-11-21T11:11:31Z",
+                "webTitle": "Long article",
+                "webUrl": "https://www.theguardian.com/long",
+                "apiUrl": "https://content.guardianapis.com/long",
+                "fields": {"body": "a" * 5000}}]}})
+        content = get_content(search_link, "test")["content"]
+        assert content[1]["content_preview"] == "a" * 1000
+
+
+class TestGetContentPreviewCache:
+    @responses.activate
+    def test_get_content_reuses_cached_previews(self):
+        mock_guardian_search(4, show_fields=[0])
+        first = get_content(search_link, "test")
+        calls = len(responses.calls)
+        second = get_content(search_link, "test")
+
+        assert calls == 4
+        assert len(responses.calls) == calls + 1
+        assert first == second
+
+    @responses.activate
+    def test_get_content_refetches_modified_articles(self):
+        mock_guardian_search(2)
+        get_content(search_link, "test")
+        responses.calls.reset()
+
+        results = [{"id": f"article-{i}",
+                    "webPublicationDate": "2023-11-21T11:11:31Z",
+                    "webTitle": f"Article {i}",
+                    "webUrl": f"https://www.theguardian.com/article-{i}",
+                    "apiUrl": f"https://content.guardianapis.com/article-{i}",
+                    "fields": {"lastModified": "2024-01-01T00:00:00Z"
+                               if i else "2023-11-21T11:11:31Z"}}
+                   for i in range(2)]
+        responses.replace(
+            responses.GET,
+            "https://content.guardianapis.com/search",
+            json={"response": {"results": results}})
+        get_content(search_link, "test")
+
+        assert [call.request.url.split("?")[0] for call in responses.calls[1:]] == [ # noqa 501
+            "https://content.guardianapis.com/article-1"]
+
+
+def mock_paged_search(pages, page_size):
+    """Registers a search of several pages, whose articles have bodies."""
+    for page in range(1, pages + 1):
+        results = [{"id": f"article-{page}-{i}",
+                    "webPublicationDate": "2023-11-21T11:11:31Z",
+                    "webTitle": f"Article {page}-{i}",
+                    "webUrl": f"https://www.theguardian.com/{page}-{i}",
+                    "apiUrl": f"https://content.guardianapis.com/{page}-{i}",
+                    "fields": {"body": f"Body {page}-{i}"}}
+                   for i in range(page_size)]
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/search",
+            json={"response": {"pages": pages, "pageSize": page_size,
+                               "results": results}},
+            match=[responses.matchers.query_param_matcher(
+                {"page": str(page)} if page > 1 else {},
+                strict_match=False)])
+
+
+class TestGetContentPagination:
+    @responses.activate
+    def test_get_content_walks_pages_up_to_max_results(self):
+        mock_paged_search(pages=5, page_size=3)
+        content = get_content(search_link, "test", max_results=7)["content"]
+
+        assert len(responses.calls) == 3
+        assert [content[i]["webTitle"] for i in content] == [
+            "Article 1-0", "Article 1-1", "Article 1-2",
+            "Article 2-0", "Article 2-1", "Article 2-2",
+            "Article 3-0"]
+
+    @responses.activate
+    def test_get_content_stops_at_last_page(self):
+        mock_paged_search(pages=2, page_size=3)
+        content = get_content(search_link, "test", max_results=100)
+
+        assert len(responses.calls) == 2
+        assert len(content["content"]) == 6
+
+    @responses.activate
+    def test_get_content_without_max_results_reads_first_page(self):
+        mock_paged_search(pages=2, page_size=3)
+        content = get_content(search_link, "test")
+
+        assert len(responses.calls) == 1
+        assert len(content["content"]) == 3
+
+
+class TestGetContentErrors:
+    @responses.activate
+    def test_get_content_raises_when_still_rate_limited(self):
+        responses.add(responses.GET,
+                      "https://content.guardianapis.com/search",
+                      status=429,
+                      json={"message": "API rate limit exceeded"})
+
+        with pytest.raises(GuardianThrottledError):
+            get_content(search_link, "test",
+                        session=create_session(retries=0))
+
+    @responses.activate
+    def test_get_content_raises_on_server_errors(self):
+        responses.add(responses.GET,
+                      "https://content.guardianapis.com/search",
+                      status=503,
+                      json={"message": "Service Unavailable"})
+
+        with pytest.raises(requests.HTTPError) as error:
+            get_content(search_link, "secret-key",
+                        session=create_session(retries=0))
+        assert "secret-key" not in str(error.value)
+
+    @responses.activate
+    def test_get_content_preview_raises_on_server_errors(self):
+        responses.add(responses.GET,
+                      "https://content.guardianapis.com/article",
+                      status=500)
+
+        with pytest.raises(requests.HTTPError):
+            get_content_preview("https://content.guardianapis.com/article",
+                                session=create_session(retries=0))
+
+
+class TestGetContentApiKey:
+    @responses.activate
+    def test_get_content_sends_the_api_key_in_a_header(self):
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/search",
+            json={"response": {"results": [{
+                "id": "article",
+                "webPublicationDate": "2023-11-21T11:11:31Z",
+                "webTitle": "Article",
+                "webUrl": "https://www.theguardian.com/article",
+                "apiUrl": "https://content.guardianapis.com/article"}]}},
+            match=[responses.matchers.header_matcher({"api-key": "test"})])
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/article",
+            json={"response": {"content": {"fields": {"body": "Body"}}}},
+            match=[responses.matchers.header_matcher({"api-key": "test"})])
+
+        content = get_content(search_link, "test", max_workers=1)
+
+        assert content["content"][1]["content_preview"] == "Body"
+        for call in responses.calls:
+            assert "api-key" not in call.request.url
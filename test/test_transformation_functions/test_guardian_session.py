@@ -0,0 +1,132 @@
+from unittest import mock
+import pytest
+import responses
+from urllib3.response import HTTPResponse
+from guardian_session import (create_session,
+                              RateLimiter,
+                              GuardianQuotaExceededError)
+from get_content import get_content
+
+
+class TestCreateSession:
+    def test_session_uses_pooled_adapter(self):
+        session = create_session(pool_size=5, retries=2)
+        adapter = session.get_adapter("https://content.guardianapis.com")
+
+        assert adapter._pool_maxsize == 5
+        assert adapter.max_retries.total == 2
+        assert 503 in adapter.max_retries.status_forcelist
+
+    @responses.activate
+    def test_get_content_uses_injected_session(self):
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/search",
+            json={"response": {"results": [{
+                "webPublicationDate": "2023-11-21T11:11:31Z",
+                "webTitle": "Article",
+                "webUrl": "https://www.theguardian.com/article",
+                "apiUrl": "https://content.guardianapis.com/article"}]}})
+        responses.add(
+            responses.GET,
+            "https://content.guardianapis.com/article",
+            json={"response": {"content": {"fields": {"body": "Body"}}}})
+
+        session = create_session()
+        with mock.patch.object(session, "get", wraps=session.get) as get:
+            content = get_content(
+                "https://content.guardianapis.com/search?q=test",
+                "test",
+                session=session)
+
+        assert get.call_count == 2
+        assert content["content"][1]["content_preview"] == "Body"
+
+    @responses.activate
+    def test_session_retries_server_errors(self):
+        url = "https://content.guardianapis.com/article"
+        responses.add(responses.GET, url, status=503)
+        responses.add(responses.GET, url, json={"ok": True})
+
+        session = create_session(retries=1)
+        with mock.patch("time.sleep"):
+            response = session.get(url, timeout=750)
+
+        assert response.json() == {"ok": True}
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_session_retries_rate_limited_requests(self):
+        url = "https://content.guardianapis.com/article"
+        responses.add(responses.GET, url, status=429,
+                      headers={"Retry-After": "2"})
+        responses.add(responses.GET, url, json={"ok": True})
+
+        session = create_session(retries=1)
+        retry = session.get_adapter(url).max_retries
+        response = session.get(url, timeout=750)
+
+        assert response.json() == {"ok": True}
+        assert retry.respect_retry_after_header
+        assert retry.backoff_jitter > 0
+
+        # responses retries without sleeping, so the wait is checked
+        # on the retry itself.
+        throttled = HTTPResponse(status=429, headers={"Retry-After": "2"})
+        retry = retry.increment(method="GET", url=url, response=throttled)
+        with mock.patch("time.sleep") as sleep:
+            retry.sleep(throttled)
+
+        sleep.assert_called_once_with(2)
+
+    @responses.activate
+    def test_session_takes_a_token_for_every_request(self):
+        url = "https://content.guardianapis.com/article"
+        responses.add(responses.GET, url, json={"ok": True})
+
+        rate_limiter = RateLimiter(rate=0)
+        session = create_session(rate_limiter=rate_limiter)
+        session.get(url, timeout=750)
+        session.get(url, timeout=750)
+
+        assert rate_limiter.requests_today == 2
+
+    def test_session_takes_a_token_for_every_retry(self):
+        rate_limiter = RateLimiter(rate=0)
+        session = create_session(retries=2, rate_limiter=rate_limiter)
+        retry = session.get_adapter(
+            "https://content.guardianapis.com").max_retries
+
+        with mock.patch("time.sleep"):
+            retry.new(total=1).sleep()
+
+        assert rate_limiter.requests_today == 1
+
+
+class TestRateLimiter:
+    def test_requests_are_spaced_by_the_rate(self):
+        rate_limiter = RateLimiter(rate=10, burst=1)
+        with mock.patch("guardian_session.time.sleep") as sleep:
+            for _ in range(3):
+                rate_limiter.acquire()
+
+        waits = [call.args[0] for call in sleep.call_args_list]
+        assert len(waits) == 2
+        assert 0.05 < waits[0] <= 0.1
+        assert 0.15 < waits[1] <= 0.2
+
+    def test_burst_is_sent_without_waiting(self):
+        rate_limiter = RateLimiter(rate=1, burst=5)
+        with mock.patch("guardian_session.time.sleep") as sleep:
+            for _ in range(5):
+                rate_limiter.acquire()
+
+        sleep.assert_not_called()
+
+    def test_daily_quota_is_enforced(self):
+        rate_limiter = RateLimiter(rate=0, daily_quota=2)
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+
+        with pytest.raises(GuardianQuotaExceededError):
+            rate_limiter.acquire()
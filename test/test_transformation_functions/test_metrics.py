@@ -0,0 +1,66 @@
+import json
+from unittest import mock
+from metrics import (record_metric,
+                     timed,
+                     flush_metrics,
+                     clear_metrics,
+                     emit_metrics)
+
+
+class TestMetrics:
+    def test_flush_prints_embedded_metric_format(self, capsys):
+        record_metric("S3ReadBytes", 10, "Bytes")
+        record_metric("S3ReadBytes", 20, "Bytes")
+        flush_metrics("transformation")
+
+        document = json.loads(capsys.readouterr().out)
+        assert document["Function"] == "transformation"
+        assert document["S3ReadBytes"] == [10, 20]
+        directive = document["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Dimensions"] == [["Function"]]
+        assert directive["Metrics"] == [{"Name": "S3ReadBytes",
+                                         "Unit": "Bytes"}]
+
+    def test_flush_clears_metrics(self, capsys):
+        record_metric("Searches", 1)
+        flush_metrics("transformation")
+        assert flush_metrics("transformation") == []
+
+    def test_flush_splits_more_than_100_values(self, capsys):
+        for i in range(250):
+            record_metric("Searches", i)
+        documents = flush_metrics("transformation")
+
+        assert [len(d["Searches"]) for d in documents] == [100, 100, 50]
+
+    def test_timed_records_milliseconds(self):
+        clear_metrics()
+
+        @timed("Work")
+        def work():
+            pass
+
+        work()
+        with timed("Work"):
+            pass
+        document = flush_metrics("transformation")[0]
+
+        assert len(document["WorkDuration"]) == 2
+        assert document["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+            {"Name": "WorkDuration", "Unit": "Milliseconds"}]
+
+    def test_emit_metrics_flushes_after_handler(self, capsys):
+        @emit_metrics("test")
+        def handler(event, context):
+            record_metric("Searches", 3)
+            return "done"
+
+        assert handler({}, None) == "done"
+        document = json.loads(capsys.readouterr().out)
+        assert document["Searches"] == [3]
+        assert len(document["InvocationDuration"]) == 1
+
+    def test_disabled_metrics_are_not_recorded(self, capsys):
+        with mock.patch("metrics.METRICS_ENABLED", False):
+            record_metric("Searches", 1)
+        assert flush_metrics("transformation") == []
@@ -0,0 +1,61 @@
+import boto3
+from unittest import mock
+from moto import mock_aws
+from preview_cache import (get_preview_key,
+                           get_cached_preview,
+                           put_cached_preview,
+                           clear_preview_cache)
+
+
+class TestGetPreviewKey:
+    def test_key_uses_id_and_last_modified(self):
+        result = {"id": "world/article",
+                  "webPublicationDate": "2023-11-21T11:11:31Z",
+                  "fields": {"lastModified": "2023-11-22T09:00:00Z"}}
+        assert get_preview_key(result) == \
+            "world/article/2023-11-22T09:00:00Z"
+
+    def test_key_falls_back_on_publication_date(self):
+        result = {"id": "world/article",
+                  "webPublicationDate": "2023-11-21T11:11:31Z"}
+        assert get_preview_key(result) == \
+            "world/article/2023-11-21T11:11:31Z"
+
+    def test_no_key_without_id(self):
+        assert get_preview_key({"webTitle": "Article"}) is None
+
+
+class TestPreviewCache:
+    def test_cache_hit_and_miss(self):
+        put_cached_preview("a/1", "Preview", path="", bucket="")
+        assert get_cached_preview("a/1", path="", bucket="") == "Preview"
+        assert get_cached_preview("a/2", path="", bucket="") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with mock.patch("preview_cache.PREVIEW_CACHE_SIZE", 2):
+            put_cached_preview("a", "A", path="", bucket="")
+            put_cached_preview("b", "B", path="", bucket="")
+            get_cached_preview("a", path="", bucket="")
+            put_cached_preview("c", "C", path="", bucket="")
+
+        assert get_cached_preview("a", path="", bucket="") == "A"
+        assert get_cached_preview("b", path="", bucket="") is None
+
+    def test_sqlite_tier_outlives_memory(self, tmp_path):
+        path = str(tmp_path / "previews.sqlite")
+        put_cached_preview("a/1", "Preview", path=path, bucket="")
+        clear_preview_cache()
+
+        assert get_cached_preview("a/1", path=path, bucket="") == "Preview"
+
+    @mock_aws
+    def test_s3_tier_outlives_memory(self):
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        s3.create_bucket(
+            Bucket="cache_bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+        put_cached_preview("a/1", "Préview", path="", bucket="cache_bucket")
+        clear_preview_cache()
+
+        assert get_cached_preview(
+            "a/1", path="", bucket="cache_bucket") == "Préview"
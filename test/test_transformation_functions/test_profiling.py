@@ -0,0 +1,87 @@
+import logging
+import pstats
+import tracemalloc
+from unittest import mock
+import pytest
+import boto3
+from moto import mock_aws
+from profiling import profile_handler
+
+
+def handler(event, context):
+    return [str(i) * 10 for i in range(event["count"])]
+
+
+class Context:
+    aws_request_id = "request-id"
+
+
+class TestProfileHandler:
+    def test_disabled_profiler_does_not_profile(self, caplog):
+        with mock.patch("profiling.PROFILING_SAMPLE_RATE", 0), \
+                mock.patch("cProfile.Profile") as profile, \
+                caplog.at_level(logging.INFO):
+            assert profile_handler("test")(handler)({"count": 2}, None) == [
+                "0" * 10, "1" * 10]
+        profile.assert_not_called()
+        assert "Profile of test" not in caplog.text
+
+    def test_unsampled_invocations_are_not_profiled(self):
+        with mock.patch("profiling.PROFILING_SAMPLE_RATE", 0.01), \
+                mock.patch("profiling.random.random", return_value=0.5), \
+                mock.patch("cProfile.Profile") as profile:
+            profile_handler("test")(handler)({"count": 1}, None)
+        profile.assert_not_called()
+
+    def test_sampled_invocation_logs_profile(self, caplog):
+        with mock.patch("profiling.PROFILING_SAMPLE_RATE", 1), \
+                caplog.at_level(logging.INFO):
+            result = profile_handler("test")(handler)({"count": 1000}, None)
+
+        assert len(result) == 1000
+        assert "Profile of test" in caplog.text
+        assert "function calls" in caplog.text
+        assert "Peak traced memory" in caplog.text
+        assert "test_profiling.py" in caplog.text
+        assert not tracemalloc.is_tracing()
+
+    @mock_aws
+    def test_profile_is_written_when_handler_raises(self):
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        s3.create_bucket(
+            Bucket="profiles",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+        with mock.patch("profiling.PROFILING_SAMPLE_RATE", 1), \
+                mock.patch("profiling.PROFILING_BUCKET", "profiles"), \
+                pytest.raises(KeyError):
+            profile_handler("test")(handler)({}, Context())
+
+        keys = sorted(c["Key"] for c in s3.list_objects_v2(
+            Bucket="profiles")["Contents"])
+        assert len(keys) == 2
+        assert keys[0].endswith("-request-id.pstats")
+        assert keys[1].endswith("-request-id.txt")
+
+    @mock_aws
+    def test_sampled_invocation_writes_profile_to_s3(self, tmp_path):
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        s3.create_bucket(
+            Bucket="profiles",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+        with mock.patch("profiling.PROFILING_SAMPLE_RATE", 1), \
+                mock.patch("profiling.PROFILING_BUCKET", "profiles"):
+            profile_handler("test")(handler)({"count": 1}, Context())
+
+        keys = sorted(c["Key"] for c in s3.list_objects_v2(
+            Bucket="profiles")["Contents"])
+        assert len(keys) == 2
+        assert keys[0].startswith("profiles/test/")
+        assert keys[0].endswith("-request-id.pstats")
+        assert keys[1].endswith("-request-id.txt")
+
+        dump = s3.get_object(Bucket="profiles", Key=keys[0])["Body"].read()
+        (tmp_path / "profile.pstats").write_bytes(dump)
+        stats = pstats.Stats(str(tmp_path / "profile.pstats"))
+        assert any(function == "handler" for _, _, function in stats.stats)
@@ -1,8 +1,12 @@
 import logging
+import json
 import pytest
 import boto3
 from moto import mock_aws
-from read_s3_json import read_s3_json, get_object_path
+import time
+from read_s3_json import (read_s3_ndjson,
+                          get_object_path,
+                          process_s3_records)
 
 logger = logging.getLogger("TestTransformationLogger")
 logger.setLevel(logging.INFO)
@@ -61,7 +65,7 @@ class TestReadS3Json:
         client.put_object(
             Body=coded_dict, Bucket="test_bucket_name", Key="test_file.json"
         )
-        read_s3_json(test_event)
+        list(read_s3_ndjson(test_event))
 
         with caplog.at_level(logging.INFO):
             assert "Data has been successfully read from S3 bucket." in caplog.text # noqa 501
@@ -79,12 +83,116 @@ class TestReadS3Json:
         client.put_object(
             Body=coded_dict, Bucket="test_bucket_name", Key="test_file.json"
         )
-        result_content = read_s3_json(test_event)
+        result_content = list(read_s3_ndjson(test_event))
 
-        assert result_content == {"c1": 1, "c2": 2}
+        assert result_content == [{"c1": 1, "c2": 2}]
 
     @mock_aws
     def test_read_s3_json_no_bucket(self, caplog):
         with caplog.at_level(logging.ERROR):
-            read_s3_json(test_event)
+            list(read_s3_ndjson(test_event))
             assert "No such bucket - test_bucket_name" in caplog.text
+
+
+class TestReadS3Ndjson:
+    @mock_aws
+    def test_read_s3_ndjson_reads_every_line(self):
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(
+            Bucket="test_bucket_name",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        client.put_object(
+            Body=b'{"c1": 1}\n\n{"c2": 2}\n',
+            Bucket="test_bucket_name",
+            Key="test_file.json")
+
+        assert list(read_s3_ndjson(test_event)) == [{"c1": 1}, {"c2": 2}]
+
+    @mock_aws
+    def test_read_s3_ndjson_reads_single_json(self):
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(
+            Bucket="test_bucket_name",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        client.put_object(
+            Body=b'{"c1": 1, "c2": 2}',
+            Bucket="test_bucket_name",
+            Key="test_file.json")
+
+        assert list(read_s3_ndjson(test_event)) == [{"c1": 1, "c2": 2}]
+
+    @mock_aws
+    def test_read_s3_ndjson_streams_across_chunks(self):
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(
+            Bucket="test_bucket_name",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        searches = [{"search_term": f"term {i}"} for i in range(50)]
+        client.put_object(
+            Body="\n".join(json.dumps(s) for s in searches).encode(),
+            Bucket="test_bucket_name",
+            Key="test_file.json")
+
+        assert list(read_s3_ndjson(test_event, chunk_size=7)) == searches
+
+    @mock_aws
+    def test_read_s3_ndjson_skips_lines_that_are_not_json(self, caplog):
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(
+            Bucket="test_bucket_name",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        client.put_object(
+            Body=b'{"c1": 1}\n{"c2":\n 2}\nhello\n{"c3": 3}\n',
+            Bucket="test_bucket_name",
+            Key="test_file.json")
+
+        with caplog.at_level(logging.ERROR):
+            searches = list(read_s3_ndjson(test_event))
+
+        assert searches == [{"c1": 1}, {"c3": 3}]
+        assert ("Line 3 of test_file.json is not valid JSON and was skipped"
+                in caplog.text)
+
+
+def s3_record(bucket, key):
+    return {"s3": {"bucket": {"name": bucket}, "object": {"key": key}}}
+
+
+class TestProcessS3Records:
+    def test_every_record_is_processed_in_order(self):
+        records = [s3_record("bucket", f"file_{i}.json") for i in range(5)]
+
+        results = process_s3_records(
+            records,
+            lambda event, number: (get_object_path(event["Records"]), number),
+            max_workers=3)
+
+        assert [result["key"] for result in results] == [
+            f"file_{i}.json" for i in range(5)]
+        assert results[2]["result"] == (("bucket", "file_2.json"), 3)
+
+    def test_errors_are_returned_per_record(self):
+        def process(event, number):
+            if number == 2:
+                raise ValueError("bad object")
+            return number
+
+        results = process_s3_records(
+            [s3_record("bucket", f"file_{i}.json") for i in range(3)],
+            process,
+            max_workers=3)
+
+        assert [result.get("result") for result in results] == [1, None, 3]
+        assert str(results[1]["error"]) == "bad object"
+
+    def test_records_are_processed_concurrently(self):
+        start = time.perf_counter()
+        process_s3_records(
+            [s3_record("bucket", f"file_{i}.json") for i in range(4)],
+            lambda event, number: time.sleep(0.2),
+            max_workers=4)
+        assert time.perf_counter() - start < 0.6
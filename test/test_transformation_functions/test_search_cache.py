@@ -0,0 +1,63 @@
+import boto3
+from unittest import mock
+from moto import mock_aws
+from search_cache import (get_search_key,
+                          get_cached_search,
+                          put_cached_search,
+                          clear_search_cache)
+
+content = {"content": {"1": {"webTitle": "Article"}}}
+
+
+class TestGetSearchKey:
+    def test_key_ignores_case_and_whitespace(self):
+        assert get_search_key({"search_term": " Machine  Learning",
+                               "date_from": "2023-01-01"}) == \
+            get_search_key({"search_term": "machine learning",
+                            "date_from": "2023-01-01 "})
+
+    def test_key_depends_on_date_and_params(self):
+        search = {"search_term": "machine learning",
+                  "date_from": "2023-01-01"}
+        keys = {get_search_key(search),
+                get_search_key({**search, "date_from": "2023-01-02"}),
+                get_search_key(search, show_fields="body"),
+                get_search_key(search, show_fields="body", page_size=50)}
+        assert len(keys) == 4
+
+
+class TestSearchCache:
+    def test_cache_hit_returns_equal_content(self):
+        put_cached_search("key", content, bucket="")
+        assert get_cached_search("key", bucket="") == content
+
+    def test_cache_miss_returns_none(self):
+        assert get_cached_search("missing", bucket="") is None
+
+    def test_expired_entry_is_not_returned(self):
+        put_cached_search("key", content, bucket="")
+        assert get_cached_search("key", ttl=0, bucket="") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with mock.patch("search_cache.SEARCH_CACHE_SIZE", 2):
+            put_cached_search("a", content, bucket="")
+            put_cached_search("b", content, bucket="")
+            get_cached_search("a", bucket="")
+            put_cached_search("c", content, bucket="")
+
+        assert get_cached_search("a", bucket="") == content
+        assert get_cached_search("b", bucket="") is None
+        assert get_cached_search("c", bucket="") == content
+
+    @mock_aws
+    def test_s3_tier_is_shared_between_containers(self):
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        s3.create_bucket(
+            Bucket="cache_bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+        put_cached_search("key", content, bucket="cache_bucket")
+        clear_search_cache()
+
+        assert get_cached_search("key", bucket="cache_bucket") == content
+        assert get_cached_search("key", ttl=0, bucket="cache_bucket") is None
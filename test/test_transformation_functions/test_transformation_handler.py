@@ -1,7 +1,11 @@
 import os
 import logging
 import json
+import time
+from unittest import mock
 import pytest
+import requests
+import responses
 from moto import mock_aws
 import boto3
 from transformation_handler import transformation_handler  # noqa 501
@@ -27,6 +31,24 @@ test_event = {
             }
 
 
+def mock_guardian_search(**kwargs):
+    """
+    Registers a Guardian search returning a single article,
+    with its body. kwargs are passed to responses.add, e.g. match.
+    """
+    results = [{
+        "id": "technology/article",
+        "webPublicationDate": "2023-11-21T11:11:31Z",
+        "webTitle": "Article",
+        "webUrl": "https://www.theguardian.com/article",
+        "apiUrl": "https://content.guardianapis.com/article",
+        "fields": {"body": "Body"}}]
+    responses.add(responses.GET,
+                  "https://content.guardianapis.com/search",
+                  json={"response": {"results": results}},
+                  **kwargs)
+
+
 @pytest.fixture(scope="function")
 def aws_credentials():
     """Mocked AWS Credentials for moto."""
@@ -94,3 +116,233 @@ class TestTransformationHandler:
         with caplog.at_level(logging.ERROR):
             transformation_handler(test_event, "content")
             assert ("Secret 'guardian_api_key' does not exist." in caplog.text)
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_refreshes_rejected_key(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        s3.put_object(
+            Bucket=s3_ingested,
+            Key="test_file.json",
+            Body=b'{"search_term": "machine learning", "date_from": "2023-01-01", "reference": "guardian_content"}') # noqa E501
+
+        search = "https://content.guardianapis.com/search"
+        responses.add(responses.GET, search, status=401,
+                      match=[responses.matchers.header_matcher(
+                          {"api-key": "old"})])
+        mock_guardian_search(
+            match=[responses.matchers.header_matcher(
+                {"api-key": "test"})])
+
+        with mock.patch("get_api_utils._secret_cache",
+                        {"guardian_api_key": ("old", time.monotonic())}):
+            transformation_handler(test_event, "content")
+
+        transformed = s3.list_objects(Bucket=s3_transformed)["Contents"]
+        assert len(transformed) == 1
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_writes_each_search_in_batch(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        s3.put_object(
+            Bucket=s3_ingested,
+            Key="test_file.json",
+            Body=b'{"search_term": "first", "date_from": "2023-01-01"}\n{"search_term": "second", "date_from": "2023-01-01"}\n') # noqa E501
+
+        mock_guardian_search()
+
+        transformation_handler(test_event, "content")
+
+        transformed = s3.list_objects(Bucket=s3_transformed)["Contents"]
+        assert len(transformed) == 2
+        assert sorted(call.request.params["q"]
+                      for call in responses.calls) == ["first", "second"]
+
+    @mock_aws
+    @responses.activate
+    def test_searches_of_an_object_run_concurrently(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        s3.put_object(
+            Bucket=s3_ingested,
+            Key="test_file.json",
+            Body="".join(json.dumps({"search_term": f"search {i}",
+                                     "date_from": "2023-01-01"}) + "\n"
+                         for i in range(4)).encode("utf-8"))
+
+        def search(request):
+            time.sleep(0.2)
+            results = [{
+                "id": request.params["q"],
+                "webPublicationDate": "2023-11-21T11:11:31Z",
+                "webTitle": request.params["q"],
+                "webUrl": "https://www.theguardian.com/article",
+                "fields": {"body": "Body"}}]
+            return 200, {}, json.dumps({"response": {"results": results}})
+
+        responses.add_callback(responses.GET,
+                               "https://content.guardianapis.com/search",
+                               callback=search)
+
+        start = time.perf_counter()
+        with mock.patch("transformation_handler.MAX_WORKERS", 4):
+            response = transformation_handler(test_event, "content")
+        elapsed = time.perf_counter() - start
+
+        assert response[0]["searches"] == 4
+        assert elapsed < 0.6
+        for i in range(4):
+            content = json.loads(s3.get_object(
+                Bucket=s3_transformed,
+                Key=f"test_file-{i + 1}-transformed-content.json",
+            )["Body"].read())
+            assert content["content"]["1"]["webTitle"] == f"search {i}"
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_processes_every_object(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        for key, search_term in [("first.json", "first"),
+                                 ("second.json", "second")]:
+            s3.put_object(
+                Bucket=s3_ingested,
+                Key=key,
+                Body=json.dumps({"search_term": search_term,
+                                 "date_from": "2023-01-01"}).encode("utf-8"))
+
+        mock_guardian_search()
+
+        event = {"Records": [
+            {"s3": {"bucket": {"name": s3_ingested},
+                    "object": {"key": key}}}
+            for key in ["first.json", "missing.json", "second.json"]]}
+        response = transformation_handler(event, "content")
+
+        assert [(r["key"], r["searches"]) for r in response] == [
+            ("first.json", 1), ("missing.json", 0), ("second.json", 1)]
+        transformed = s3.list_objects(Bucket=s3_transformed)["Contents"]
+        assert sorted(c["Key"] for c in transformed) == [
+            "first-transformed-content.json",
+            "second-transformed-content.json"]
+
+    @mock_aws
+    @responses.activate
+    def test_concurrent_invocations_do_not_overwrite_each_other(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        for key in ["first-search-terms.json", "second-search-terms.json"]:
+            s3.put_object(
+                Bucket=s3_ingested,
+                Key=key,
+                Body=b'{"search_term": "a", "date_from": "2023-01-01"}\n{"search_term": "b", "date_from": "2023-01-01"}\n') # noqa E501
+
+        mock_guardian_search()
+
+        # S3 sends one record per notification, so each object
+        # starts its own invocation, possibly in the same second.
+        for key in ["first-search-terms.json", "second-search-terms.json"]:
+            transformation_handler(
+                {"Records": [{"s3": {"bucket": {"name": s3_ingested},
+                                     "object": {"key": key}}}]},
+                "content")
+
+        transformed = s3.list_objects(Bucket=s3_transformed)["Contents"]
+        assert sorted(c["Key"] for c in transformed) == [
+            "first-1-transformed-content.json",
+            "first-2-transformed-content.json",
+            "second-1-transformed-content.json",
+            "second-2-transformed-content.json"]
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_caches_repeated_searches(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        s3.put_object(
+            Bucket=s3_ingested,
+            Key="test_file.json",
+            Body=b'{"search_term": "Machine learning", "date_from": "2023-01-01"}\n{"search_term": "machine  learning ", "date_from": "2023-01-01"}\n') # noqa E501
+
+        mock_guardian_search()
+
+        transformation_handler(test_event, "content")
+
+        assert len(responses.calls) == 1
+        transformed = [
+            s3.get_object(Bucket=s3_transformed, Key=c["Key"])["Body"].read()
+            for c in s3.list_objects(Bucket=s3_transformed)["Contents"]]
+        assert len(transformed) == 2
+        assert transformed[0] == transformed[1]
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_async_mode_matches_sync(
+            self, s3_fixture, secrets_fixture):
+        s3, s3_ingested, s3_transformed = s3_fixture
+        for key, body in [("first.json", b'{"search_term": "first", "date_from": "2023-01-01"}\n{"search_term": "second", "date_from": "2023-01-01"}\n'), # noqa E501
+                          ("second.json", b'{"search_term": "third", "date_from": "2023-01-01"}')]: # noqa E501
+            s3.put_object(Bucket=s3_ingested, Key=key, Body=body)
+
+        mock_guardian_search()
+
+        event = {"Records": [
+            {"s3": {"bucket": {"name": s3_ingested},
+                    "object": {"key": key}}}
+            for key in ["first.json", "missing.json", "second.json"]]}
+        with mock.patch("transformation_handler.TRANSFORMATION_MODE",
+                        "async"):
+            response = transformation_handler(event, "content")
+
+        assert [(r["key"], r["searches"]) for r in response] == [
+            ("first.json", 2), ("missing.json", 0), ("second.json", 1)]
+        transformed = s3.list_objects(Bucket=s3_transformed)["Contents"]
+        assert sorted(c["Key"] for c in transformed) == [
+            "first-1-transformed-content.json",
+            "first-2-transformed-content.json",
+            "second-transformed-content.json"]
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_emits_metrics_without_api_key(
+            self, s3_fixture, secrets_fixture, caplog, capsys):
+        s3, s3_ingested, _ = s3_fixture
+        s3.put_object(Bucket=s3_ingested, Key="test_file.json",
+                      Body=json.dumps({"search_term": "machine learning",
+                                       "date_from": "2023-01-01"}))
+        mock_guardian_search()
+
+        with caplog.at_level(logging.INFO):
+            transformation_handler(test_event, None)
+        assert "Got API key from AWS Secrets Manager." in caplog.text
+        assert "api-key=test" not in caplog.text
+
+        document = json.loads(capsys.readouterr().out)
+        assert document["Function"] == "transformation"
+        for name in ["InvocationDuration", "S3ReadDuration", "S3ReadBytes",
+                     "SecretFetchDuration", "GuardianSearchDuration",
+                     "GuardianSearchBytes", "GuardianSearchRetries",
+                     "S3WriteDuration", "S3WriteBytes"]:
+            assert len(document[name]) == 1
+
+    @mock_aws
+    @responses.activate
+    def test_transformation_handler_logs_connection_errors_without_api_key(
+            self, s3_fixture, secrets_fixture, caplog):
+        s3, s3_ingested, _ = s3_fixture
+        s3.put_object(Bucket=s3_ingested, Key="test_file.json",
+                      Body=json.dumps({"search_term": "machine learning",
+                                       "date_from": "2023-01-01"}))
+        responses.add(responses.GET,
+                      "https://content.guardianapis.com/search",
+                      body=requests.ConnectionError("Connection refused"))
+
+        with caplog.at_level(logging.INFO):
+            response = transformation_handler(test_event, None)
+
+        assert "Connection refused" in response[0]["error"]
+        assert "Error whilst processing JSON file" in caplog.text
+        assert "api-key" not in caplog.text
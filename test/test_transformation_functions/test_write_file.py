@@ -1,3 +1,4 @@
+import gzip
 import os
 from datetime import datetime as dt
 import logging
@@ -5,7 +6,7 @@ import pytest
 import time_machine
 import boto3
 from moto import mock_aws
-from write_file import write_file_to_s3
+from write_file import write_file_to_s3, get_source_stem
 
 logger = logging.getLogger("MyLogger")
 logger.setLevel(logging.INFO)
@@ -71,3 +72,43 @@ class TestWriteFile:
 
             assert "No search terms provided." in str(message.value)
             assert "No search terms provided." in caplog.text
+
+    @time_machine.travel(dt(2020, 1, 1, 17, 30, 19))
+    def test_part_is_added_to_file_name(self):
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="streaming-data-transformed-data-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        write_file_to_s3({"content": {}}, 1)
+        write_file_to_s3({"content": {}}, 2)
+        response = s3.list_objects(Bucket="streaming-data-transformed-data-bucket") # noqa 501
+        assert [c["Key"] for c in response["Contents"]] == [
+            "2020-1-1-173019-1-transformed-content.json",
+            "2020-1-1-173019-2-transformed-content.json"]
+
+    @time_machine.travel(dt(2020, 1, 1, 17, 30, 19))
+    def test_compressed_output_format(self):
+        s3 = boto3.client("s3")
+        s3.create_bucket(
+            Bucket="streaming-data-transformed-data-bucket",
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        write_file_to_s3({"content": {"1": {"webTitle": "a"}}},
+                         output_format="ndjson-gzip")
+        response = s3.get_object(
+            Bucket="streaming-data-transformed-data-bucket",
+            Key="2020-1-1-173019-transformed-content.ndjson.gz")
+        assert response["ContentEncoding"] == "gzip"
+        assert gzip.decompress(response["Body"].read()) == \
+            b'{"1":{"webTitle":"a"}}\n'
+
+
+class TestGetSourceStem:
+    def test_ingested_key_endings_are_removed(self):
+        assert get_source_stem(
+            "2023-1-1-173019-shardId-000000000000-1-search-terms.json"
+        ) == "2023-1-1-173019-shardId-000000000000-1"
+
+    def test_other_keys_lose_their_extension(self):
+        assert get_source_stem("folder/test_file.json") == "folder-test_file"